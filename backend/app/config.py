@@ -3,8 +3,12 @@ Configuration settings for the DeepKlarity Quiz Generator application.
 Loads environment variables and provides application-wide settings.
 """
 
+import os
+from functools import lru_cache
+from dotenv import dotenv_values
+from pydantic import PrivateAttr, SecretStr
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import Any, Dict, Tuple
 
 
 class Settings(BaseSettings):
@@ -12,9 +16,7 @@ class Settings(BaseSettings):
     
     # Database
     DATABASE_URL: str = "sqlite:///./deepklarity_quiz.db"
-    
-    # OpenAI API
-    OPENAI_API_KEY: str = ""
+    POOL_SIZE: int = 20
     
     # Server
     HOST: str = "0.0.0.0"
@@ -24,6 +26,9 @@ class Settings(BaseSettings):
     # CORS
     CORS_ORIGINS: str = "http://localhost:5173,http://localhost:3000"
     
+    # Cache (optional Redis tier shared across workers)
+    REDIS_URL: str = ""
+    
     # Application
     APP_NAME: str = "DeepKlarity Quiz Generator"
     APP_VERSION: str = "1.0.0"
@@ -33,20 +38,62 @@ class Settings(BaseSettings):
     # LLM Settings
     LLM_TEMPERATURE: float = 0.3
     LLM_MODEL: str = "gpt-4o-mini"
+    PROMPT_COMPRESSION_RATE: float = 1.0  # fraction of article tokens kept (e.g. 0.5, needs llmlingua); 1 disables
     
     # Scraping
     REQUEST_TIMEOUT: int = 30
+    SCRAPE_CACHE_DIR: str = ""  # directory for the on-disk scrape cache; empty disables
     USER_AGENT: str = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36"
     
+    _cors_origins_list: Tuple[str, ...] = PrivateAttr(default=())
+    _secrets: Dict[str, SecretStr] = PrivateAttr(default_factory=dict)
+    
     class Config:
         env_file = ".env"
         case_sensitive = True
+        extra = "ignore"  # lazily resolved secrets live in the env file too
+    
+    def model_post_init(self, __context: Any) -> None:
+        """Split CORS_ORIGINS once when settings are loaded."""
+        self._cors_origins_list = tuple(origin.strip() for origin in self.CORS_ORIGINS.split(","))
     
     @property
-    def cors_origins_list(self) -> List[str]:
-        """Convert CORS_ORIGINS string to list."""
-        return [origin.strip() for origin in self.CORS_ORIGINS.split(",")]
+    def cors_origins_list(self) -> Tuple[str, ...]:
+        """CORS_ORIGINS as a tuple of origins."""
+        return self._cors_origins_list
+    
+    @property
+    def OPENAI_API_KEY(self) -> str:
+        """OpenAI API key, resolved on first access."""
+        return self._secret("OPENAI_API_KEY").get_secret_value()
+    
+    def _secret(self, name: str) -> SecretStr:
+        """
+        Resolve a secret from the environment (falling back to the env file) and memoize it.
+        
+        Secrets are not declared as fields so that loading settings never
+        blocks on, or fails because of, a secret that is not provisioned yet.
+        
+        Args:
+            name: Environment variable name
+            
+        Returns:
+            The secret value, empty if it is not set anywhere
+        """
+        if name not in self._secrets:
+            value = os.environ.get(name)
+            if value is None:
+                env_file = self.model_config.get("env_file")
+                value = dotenv_values(env_file).get(name) if env_file else None
+            self._secrets[name] = SecretStr(value or "")
+        return self._secrets[name]
+
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Return the cached application settings."""
+    return Settings()
 
 
 # Create global settings instance
-settings = Settings()
+settings = get_settings()
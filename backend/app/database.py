@@ -1,46 +1,88 @@
 """
 Database configuration and session management.
-Provides SQLAlchemy engine and session creation.
+Provides the async SQLAlchemy engine and session creation.
 """
 
-from sqlalchemy import create_engine
+import asyncio
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from .config import settings
 
+
+def _async_database_url(url: str) -> str:
+    """
+    Map a plain SQLite URL onto its async driver.
+
+    URLs that already name a driver (e.g. ``postgresql+asyncpg://``) are
+    returned unchanged.
+
+    Args:
+        url: Database URL from settings
+
+    Returns:
+        URL usable by ``create_async_engine``
+    """
+    if url.startswith("sqlite://"):
+        return url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    return url
+
+
 # Create database engine
-engine = create_engine(
-    settings.DATABASE_URL,
-    connect_args={"check_same_thread": False},  # Needed for SQLite
+engine = create_async_engine(
+    _async_database_url(settings.DATABASE_URL),
+    connect_args={"check_same_thread": False} if settings.DATABASE_URL.startswith("sqlite") else {},
+    poolclass=AsyncAdaptedQueuePool,  # aiosqlite defaults to NullPool
+    pool_size=settings.POOL_SIZE,
+    max_overflow=settings.POOL_SIZE * 2,
     pool_pre_ping=True,
     echo=settings.DEBUG
 )
 
 # Create session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = async_sessionmaker(
+    bind=engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
 
 # Base class for models
 Base = declarative_base()
 
 
-def get_db():
+async def get_db():
     """
     Dependency function to get database session.
-    Yields a database session and ensures it's closed after use.
-    
+    Yields an async database session and ensures it's closed after use.
+
     Yields:
-        Session: SQLAlchemy database session
+        AsyncSession: SQLAlchemy async database session
     """
-    db = SessionLocal()
-    try:
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 
-def init_db():
+async def init_db():
     """
     Initialize database by creating all tables.
     Should be called on application startup.
     """
-    Base.metadata.create_all(bind=engine)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+
+async def warm_connection_pool(size: int):
+    """
+    Open ``size`` pooled connections up front so early requests skip connect cost.
+
+    Args:
+        size: Number of connections to establish
+    """
+    async def _one():
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    await asyncio.gather(*[_one() for _ in range(size)])
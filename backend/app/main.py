@@ -2,37 +2,99 @@
 Main FastAPI application entry point.
 """
 
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import GZipResponder
+from starlette.types import Message, Receive, Scope, Send
 from .config import settings
-from .database import init_db
+from .database import engine, init_db, warm_connection_pool
+from .services.llm_service import llm_service
+from .services.quiz_jobs import quiz_jobs
+from .services.scraper import scraper
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Initialize the database and connection pool on startup, release pools on shutdown."""
+    await init_db()
+    await warm_connection_pool(settings.POOL_SIZE)
+    print(f"{settings.APP_NAME} v{settings.APP_VERSION} started!")
+    print(f"Database: {settings.DATABASE_URL.split('@')[1] if '@' in settings.DATABASE_URL else 'configured'}")
+    yield
+    await quiz_jobs.shutdown()
+    await llm_service.aclose()
+    await scraper.aclose()
+    await engine.dispose()
+
+
+# Event streams must reach the client chunk by chunk; never compress them
+UNCOMPRESSED_MEDIA_TYPES = frozenset({"text/event-stream", "application/x-ndjson"})
+
+
+class StreamingAwareGZipMiddleware(GZipMiddleware):
+    """
+    GZipMiddleware that passes SSE and NDJSON streams through uncompressed.
+
+    Starlette's gzip responder does not flush between body chunks, so a
+    compressed stream would reach the client only when it closes.
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or "gzip" not in Headers(scope=scope).get("Accept-Encoding", ""):
+            await self.app(scope, receive, send)
+            return
+
+        responder = GZipResponder(self.app, self.minimum_size, compresslevel=self.compresslevel)
+        responder.send = send
+        passthrough = False
+
+        async def send_maybe_gzip(message: Message) -> None:
+            nonlocal passthrough
+            if message["type"] == "http.response.start":
+                content_type = Headers(raw=message["headers"]).get("content-type", "")
+                passthrough = content_type.split(";")[0].strip() in UNCOMPRESSED_MEDIA_TYPES
+            if passthrough:
+                await send(message)
+            else:
+                await responder.send_with_gzip(message)
+
+        await self.app(scope, receive, send_maybe_gzip)
+
+
+CORS_ORIGINS = tuple(settings.cors_origins_list)
+CORS_METHODS = ("GET", "POST", "DELETE", "OPTIONS")
+CORS_HEADERS = ("content-type", "authorization", "last-event-id")
+
 
 # Create FastAPI application
 app = FastAPI(
+    lifespan=lifespan,
     title=settings.APP_NAME,
     version=settings.APP_VERSION,
     description="AI-powered quiz generator from web articles using Google Gemini",
-    debug=settings.DEBUG
+    debug=settings.DEBUG,
+    default_response_class=ORJSONResponse
 )
 
+# Compress large quiz payloads
+app.add_middleware(StreamingAwareGZipMiddleware, minimum_size=1024, compresslevel=5)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=settings.cors_origins_list,
+    allow_origins=CORS_ORIGINS,
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=CORS_METHODS,
+    allow_headers=CORS_HEADERS,
+    max_age=86400,  # let browsers cache preflight responses for a day
 )
 
 
-@app.on_event("startup")
-async def startup_event():
-    """Initialize database on application startup."""
-    init_db()
-    print(f"{settings.APP_NAME} v{settings.APP_VERSION} started!")
-    print(f"Database: {settings.DATABASE_URL.split('@')[1] if '@' in settings.DATABASE_URL else 'configured'}")
-
-
 @app.get("/")
 async def root():
     """Root endpoint - API health check."""
@@ -3,8 +3,7 @@ Database models for quiz application.
 Uses JSON storage for complete quiz data instead of relational tables.
 """
 
-from sqlalchemy import Column, Integer, String, Text, DateTime, JSON
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, DDL, Index, Integer, String, Text, DateTime, JSON, event
 from sqlalchemy.sql import func
 from ..database import Base
 import json
@@ -41,6 +40,16 @@ class Quiz(Base):
     }
     """
     __tablename__ = "quizzes"
+    __table_args__ = (
+        Index(
+            "ix_quizzes_title_trgm",
+            "title",
+            postgresql_using="gin",
+            postgresql_ops={"title": "gin_trgm_ops"}
+        ).ddl_if(dialect="postgresql"),
+        Index("ix_quizzes_title", "title").ddl_if(dialect="sqlite"),
+        Index("ix_quizzes_created_at", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     url = Column(Text, nullable=False, unique=True, index=True)
@@ -76,3 +85,42 @@ class Quiz(Base):
     def related_topics(self) -> List[str]:
         """Get related topics from quiz_data."""
         return self.quiz_data.get('related_topics', [])
+
+
+# SQLite trigram full-text index over title and url for history search, so
+# MATCH finds the same case-insensitive substrings as ILIKE '%search%'.
+# Statements are idempotent so they also bring existing databases up to date;
+# the backfill only does work while the index is still empty.
+QUIZ_FTS_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS quizzes_fts USING fts5(title, url, tokenize='trigram')",
+    """
+    CREATE TRIGGER IF NOT EXISTS quizzes_fts_insert AFTER INSERT ON quizzes BEGIN
+        INSERT INTO quizzes_fts (rowid, title, url) VALUES (new.id, new.title, new.url);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS quizzes_fts_delete AFTER DELETE ON quizzes BEGIN
+        DELETE FROM quizzes_fts WHERE rowid = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS quizzes_fts_update AFTER UPDATE OF title, url ON quizzes BEGIN
+        UPDATE quizzes_fts SET title = new.title, url = new.url WHERE rowid = old.id;
+    END
+    """,
+    """
+    INSERT INTO quizzes_fts (rowid, title, url)
+    SELECT id, title, url FROM quizzes
+    WHERE NOT EXISTS (SELECT 1 FROM quizzes_fts)
+    """,
+]
+
+for _statement in QUIZ_FTS_DDL:
+    event.listen(Base.metadata, "after_create", DDL(_statement).execute_if(dialect="sqlite"))
+
+# The trigram index on title needs pg_trgm installed before the table is created
+event.listen(
+    Base.metadata,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql")
+)
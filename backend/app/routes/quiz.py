@@ -4,10 +4,16 @@ FastAPI routes for quiz operations.
 
 import math
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+import anyio
+import orjson
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
+from pydantic import TypeAdapter
+from sqlalchemy import Row
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
-from ..database import get_db
+from ..database import SessionLocal, get_db
+from ..models.quiz import Quiz
 from ..schemas.quiz import (
     QuizGenerateRequest,
     QuizResponse,
@@ -17,55 +23,113 @@ from ..schemas.quiz import (
     ErrorDetail
 )
 from ..services.quiz_generator import quiz_service, QuizGenerationError
+from ..services.quiz_jobs import quiz_jobs, QuizJobNotFoundError
 from ..services.scraper import ScraperError
 
 router = APIRouter()
 
+# Serializer for list items built from trusted DB rows
+_QUIZ_ITEM_ADAPTER = TypeAdapter(QuizListItem)
 
-@router.post("/quiz/generate", response_model=QuizResponse)
-async def generate_quiz(
-    request: QuizGenerateRequest,
-    db: Session = Depends(get_db)
-):
+
+def _dump_list_item(row: Row) -> bytes:
     """
-    Generate a new quiz from a URL.
+    Encode a quiz history row as a QuizListItem JSON object.
+    
+    Args:
+        row: Projected history row
+        
+    Returns:
+        JSON bytes
+    """
+    # Rows come straight from our own table, so skip re-validation
+    item = QuizListItem.model_construct(
+        id=row.id,
+        url=row.url,
+        title=row.title,
+        summary=row.summary or "",
+        question_count=row.question_count or 0,
+        created_at=row.created_at
+    )
+    return _QUIZ_ITEM_ADAPTER.dump_json(item)
+
 
+def _serialize_quiz(quiz: Quiz) -> dict:
+    """
+    Build the QuizResponse-shaped payload for a quiz.
+    
     Args:
-        request: Quiz generation request with URL and optional num_questions
-        db: Database session
+        quiz: Quiz row
+        
+    Returns:
+        Response dictionary using the JSON structure
+    """
+    qd = quiz.quiz_data
+    return {
+        "id": quiz.id,
+        "url": quiz.url,
+        "title": quiz.title,
+        "summary": qd.get("summary", ""),
+        "key_entities": qd.get("key_entities", {}),
+        "sections": qd.get("sections", []),
+        "quiz": qd.get("quiz", []),
+        "related_topics": qd.get("related_topics", []),
+        "created_at": quiz.created_at
+    }
+
 
+def _dump_stream_event(kind: str, payload) -> bytes:
+    """
+    Encode one quiz generation event as an NDJSON line.
+    
+    Args:
+        kind: "scraped", "question" or "quiz"
+        payload: Event dictionary or saved Quiz
+        
     Returns:
-        Complete quiz with questions, entities, and related topics in JSON format
+        JSON line bytes
+    """
+    return orjson.dumps({"type": kind, "data": _event_data(kind, payload)}) + b"\n"
 
-    Raises:
-        HTTPException: If generation fails
+
+def _dump_sse_event(index: int, kind: str, payload) -> bytes:
     """
-    try:
-        # Generate quiz
-        quiz = quiz_service.generate_quiz(
-            db=db,
-            url=request.url,
-            num_questions=request.num_questions
-        )
+    Encode one quiz job event as a Server-Sent Event.
+    
+    Args:
+        index: Event position in the job, sent as the SSE id for resuming
+        kind: "scraped", "question", "quiz" or "error"
+        payload: Event dictionary, saved Quiz or the exception that ended the job
+        
+    Returns:
+        SSE frame bytes
+    """
+    if kind == "error":
+        data = _generation_error(payload).detail["error"]
+    else:
+        data = _event_data(kind, payload)
+    return b"id: %d\nevent: %s\ndata: %s\n\n" % (index, kind.encode(), orjson.dumps(data))
 
-        # Format response using the JSON structure
-        response_data = {
-            "id": quiz.id,
-            "url": quiz.url,
-            "title": quiz.title,
-            "summary": quiz.quiz_data.get("summary", ""),
-            "key_entities": quiz.quiz_data.get("key_entities", {}),
-            "sections": quiz.quiz_data.get("sections", []),
-            "quiz": quiz.quiz_data.get("quiz", []),
-            "related_topics": quiz.quiz_data.get("related_topics", []),
-            "created_at": quiz.created_at
-        }
 
-        return response_data
+def _event_data(kind: str, payload):
+    if kind == "quiz":
+        return _serialize_quiz(payload)
+    return payload
+
+
+def _generation_error(e: Exception) -> HTTPException:
+    """
+    Map a quiz generation failure onto the API error response.
+    
+    Args:
+        e: Exception raised while generating
         
-    except ScraperError as e:
+    Returns:
+        HTTPException carrying an ErrorResponse-shaped detail
+    """
+    if isinstance(e, ScraperError):
         print(f"ScraperError: {str(e)}")  # Debug logging
-        raise HTTPException(
+        return HTTPException(
             status_code=400,
             detail={
                 "error": {
@@ -76,7 +140,7 @@ async def generate_quiz(
                 }
             }
         )
-    except QuizGenerationError as e:
+    if isinstance(e, QuizGenerationError):
         error_msg = str(e)
         print(f"QuizGenerationError: {error_msg}")  # Debug logging
         
@@ -87,7 +151,7 @@ async def generate_quiz(
         else:
             code = "GENERATION_ERROR"
         
-        raise HTTPException(
+        return HTTPException(
             status_code=500,
             detail={
                 "error": {
@@ -98,71 +162,213 @@ async def generate_quiz(
                 }
             }
         )
+    return HTTPException(
+        status_code=500,
+        detail={
+            "error": {
+                "code": "INTERNAL_ERROR",
+                "message": "An unexpected error occurred",
+                "details": str(e),
+                "suggestion": "Please try again later"
+            }
+        }
+    )
+
+
+@router.post(
+    "/quiz/generate",
+    response_model=None,
+    responses={200: {"model": QuizResponse}}
+)
+async def generate_quiz(
+    request: QuizGenerateRequest,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Generate a new quiz from a URL.
+
+    Args:
+        request: Quiz generation request with URL and optional num_questions
+        db: Database session
+
+    Returns:
+        Complete quiz with questions, entities, and related topics in JSON format
+
+    Raises:
+        HTTPException: If generation fails
+    """
+    try:
+        # Generate quiz
+        quiz = await quiz_service.generate_quiz(
+            db=db,
+            url=str(request.url),
+            num_questions=request.num_questions
+        )
+
+        return ORJSONResponse(_serialize_quiz(quiz))
+        
+    except Exception as e:
+        raise _generation_error(e)
+
+
+@router.post(
+    "/quiz/generate/stream",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"application/x-ndjson": {}}}}
+)
+async def stream_quiz_generation(request: QuizGenerateRequest):
+    """
+    Generate a new quiz from a URL, streaming questions as they are produced.
+
+    The body is newline-delimited JSON: a ``{"type": "scraped", "data": ...}``
+    line once the article is fetched, one ``{"type": "question", "data": ...}``
+    line per question, then ``{"type": "quiz", "data": ...}`` with the complete
+    saved quiz, or ``{"type": "error", "error": ...}`` if generation fails midway.
+
+    Args:
+        request: Quiz generation request with URL and optional num_questions
+
+    Returns:
+        NDJSON stream of generation events
+
+    Raises:
+        HTTPException: If generation fails before the first question
+    """
+    # The session must outlive this handler, so it is closed by the stream itself
+    db = SessionLocal()
+    events = quiz_service.stream_quiz(
+        db=db,
+        url=str(request.url),
+        num_questions=request.num_questions
+    )
+
+    # Wait for the first event so scraping errors still map to HTTP status codes
+    try:
+        first_event = await events.__anext__()
     except Exception as e:
+        await events.aclose()
+        await db.close()
+        raise _generation_error(e)
+
+    async def body():
+        try:
+            yield _dump_stream_event(*first_event)
+            async for event in events:
+                yield _dump_stream_event(*event)
+        except Exception as e:
+            yield orjson.dumps({"type": "error", **_generation_error(e).detail}) + b"\n"
+        finally:
+            # A client disconnect cancels this scope; shield so the session is still closed
+            with anyio.CancelScope(shield=True):
+                await events.aclose()
+                await db.close()
+
+    return StreamingResponse(body(), media_type="application/x-ndjson")
+
+
+@router.post("/quiz/jobs", status_code=202)
+async def start_quiz_job(request: QuizGenerateRequest):
+    """
+    Start generating a quiz in the background.
+
+    Args:
+        request: Quiz generation request with URL and optional num_questions
+
+    Returns:
+        The job ID and the URL of its event stream
+    """
+    job = quiz_jobs.start(url=str(request.url), num_questions=request.num_questions)
+    return {"job_id": job.id, "events_url": f"/api/quiz/stream/{job.id}"}
+
+
+@router.get(
+    "/quiz/stream/{job_id}",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"text/event-stream": {}}}}
+)
+async def stream_quiz_job(
+    job_id: str,
+    last_event_id: Optional[str] = Header(default=None)
+):
+    """
+    Follow a background quiz job as Server-Sent Events.
+
+    Emits ``scraped``, one ``question`` per question, then ``quiz`` with the
+    saved quiz or ``error``. Reconnecting clients resume after
+    ``Last-Event-ID``.
+
+    Args:
+        job_id: ID returned by POST /quiz/jobs
+        last_event_id: SSE id of the last event the client received
+
+    Returns:
+        text/event-stream of job events
+
+    Raises:
+        HTTPException: If the job is unknown or expired
+    """
+    try:
+        job = quiz_jobs.get(job_id)
+    except QuizJobNotFoundError:
         raise HTTPException(
-            status_code=500,
+            status_code=404,
             detail={
                 "error": {
-                    "code": "INTERNAL_ERROR",
-                    "message": "An unexpected error occurred",
-                    "details": str(e),
-                    "suggestion": "Please try again later"
+                    "code": "JOB_NOT_FOUND",
+                    "message": f"Quiz job {job_id} not found",
+                    "suggestion": "Start a new job with POST /api/quiz/jobs"
                 }
             }
         )
 
+    start = int(last_event_id) + 1 if last_event_id and last_event_id.isdigit() else 0
 
-@router.get("/quiz/history", response_model=QuizHistoryResponse)
+    async def body():
+        async for index, kind, payload in job.follow(start):
+            yield _dump_sse_event(index, kind, payload)
+
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get(
+    "/quiz/history",
+    response_model=None,
+    responses={200: {"model": QuizHistoryResponse}}
+)
 async def get_quiz_history(
     page: int = Query(default=1, ge=1),
     limit: int = Query(default=20, ge=1, le=100),
-    search: Optional[str] = Query(default=None),
-    db: Session = Depends(get_db)
+    search: Optional[str] = Query(default=None)
 ):
     """
     Get paginated quiz history.
     
+    The page is streamed as a JSON document in the QuizHistoryResponse
+    shape, writing each item as its row arrives from the database.
+    
     Args:
         page: Page number (1-indexed)
         limit: Items per page
         search: Optional search query for title/URL
-        db: Database session
         
     Returns:
         Paginated list of quizzes with metadata
     """
+    # The session outlives this handler, so it is owned by the stream
+    db = SessionLocal()
     try:
-        quizzes, total = quiz_service.get_all_quizzes(
+        result, first_row, total = await quiz_service.stream_quizzes(
             db=db,
             page=page,
             limit=limit,
             search=search
         )
-        
-        # Format quiz list items
-        quiz_items = []
-        for quiz in quizzes:
-            quiz_items.append(
-                QuizListItem(
-                    id=quiz.id,
-                    url=quiz.url,
-                    title=quiz.title,
-                    summary=quiz.quiz_data.get("summary", ""),
-                    question_count=len(quiz.quiz_data.get("quiz", [])),
-                    created_at=quiz.created_at
-                )
-            )
-        
-        total_pages = math.ceil(total / limit) if total else 0
-        return QuizHistoryResponse(
-            total=total,
-            page=page,
-            limit=limit,
-            total_pages=total_pages,
-            quizzes=quiz_items
-        )
-        
     except Exception as e:
+        await db.close()
         raise HTTPException(
             status_code=500,
             detail={
@@ -174,11 +380,40 @@ async def get_quiz_history(
             }
         )
 
+    total_pages = math.ceil(total / limit) if total else 0
+    header = orjson.dumps({
+        "total": total,
+        "page": page,
+        "limit": limit,
+        "total_pages": total_pages
+    })
+
+    async def body():
+        try:
+            # Reopen the header object to append the quizzes array
+            yield header[:-1] + b',"quizzes":['
+            if first_row is not None:
+                yield _dump_list_item(first_row)
+                async for row in result:
+                    yield b"," + _dump_list_item(row)
+            yield b"]}"
+        finally:
+            # A client disconnect cancels this scope; shield so the session is still closed
+            with anyio.CancelScope(shield=True):
+                await result.close()
+                await db.close()
+
+    return StreamingResponse(body(), media_type="application/json")
 
-@router.get("/quiz/{quiz_id}", response_model=QuizResponse)
+
+@router.get(
+    "/quiz/{quiz_id}",
+    response_model=None,
+    responses={200: {"model": QuizResponse}}
+)
 async def get_quiz_by_id(
     quiz_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Get a specific quiz by ID.
@@ -193,7 +428,11 @@ async def get_quiz_by_id(
     Raises:
         HTTPException: If quiz not found
     """
-    quiz = quiz_service.get_quiz_by_id(db, quiz_id)
+    cached = quiz_service.quiz_cache.get(quiz_id)
+    if cached is not None:
+        return Response(content=cached, media_type="application/json")
+
+    quiz = await quiz_service.get_quiz_by_id(db, quiz_id)
 
     if not quiz:
         raise HTTPException(
@@ -207,26 +446,15 @@ async def get_quiz_by_id(
             }
         )
 
-    # Format response using the JSON structure
-    response_data = {
-        "id": quiz.id,
-        "url": quiz.url,
-        "title": quiz.title,
-        "summary": quiz.quiz_data.get("summary", ""),
-        "key_entities": quiz.quiz_data.get("key_entities", {}),
-        "sections": quiz.quiz_data.get("sections", []),
-        "quiz": quiz.quiz_data.get("quiz", []),
-        "related_topics": quiz.quiz_data.get("related_topics", []),
-        "created_at": quiz.created_at
-    }
-
-    return response_data
+    content = orjson.dumps(_serialize_quiz(quiz))
+    quiz_service.quiz_cache[quiz_id] = content
+    return Response(content=content, media_type="application/json")
 
 
 @router.delete("/quiz/{quiz_id}")
 async def delete_quiz(
     quiz_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Delete a quiz by ID.
@@ -241,36 +469,32 @@ async def delete_quiz(
     Raises:
         HTTPException: If quiz not found
     """
-    quiz = quiz_service.get_quiz_by_id(db, quiz_id)
-    
-    if not quiz:
+    try:
+        deleted = await quiz_service.delete_quiz(db, quiz_id)
+    except Exception as e:
+        await db.rollback()
         raise HTTPException(
-            status_code=404,
+            status_code=500,
             detail={
                 "error": {
-                    "code": "QUIZ_NOT_FOUND",
-                    "message": f"Quiz with ID {quiz_id} not found"
+                    "code": "DELETE_FAILED",
+                    "message": "Failed to delete quiz",
+                    "details": str(e)
                 }
             }
         )
     
-    try:
-        db.delete(quiz)
-        db.commit()
-        
-        return {
-            "message": f"Quiz {quiz_id} deleted successfully"
-        }
-        
-    except Exception as e:
-        db.rollback()
+    if not deleted:
         raise HTTPException(
-            status_code=500,
+            status_code=404,
             detail={
                 "error": {
-                    "code": "DELETE_FAILED",
-                    "message": "Failed to delete quiz",
-                    "details": str(e)
+                    "code": "QUIZ_NOT_FOUND",
+                    "message": f"Quiz with ID {quiz_id} not found"
                 }
             }
         )
+    
+    return {
+        "message": f"Quiz {quiz_id} deleted successfully"
+    }
@@ -2,10 +2,10 @@
 
 from .quiz import (
     QuizGenerateRequest,
+    QuestionModel,
     QuizResponse,
-    QuestionResponse,
-    KeyEntityResponse,
-    RelatedTopicResponse,
+    QuestionJSON,
+    KeyEntitiesJSON,
     QuizListItem,
     QuizHistoryResponse,
     ErrorResponse,
@@ -16,10 +16,10 @@ from .quiz import (
 
 __all__ = [
     "QuizGenerateRequest",
+    "QuestionModel",
     "QuizResponse",
-    "QuestionResponse",
-    "KeyEntityResponse",
-    "RelatedTopicResponse",
+    "QuestionJSON",
+    "KeyEntitiesJSON",
     "QuizListItem",
     "QuizHistoryResponse",
     "ErrorResponse",
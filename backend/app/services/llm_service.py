@@ -7,70 +7,254 @@ from langchain_openai import ChatOpenAI
 from langchain_core.prompts import PromptTemplate
 from langchain.output_parsers import PydanticOutputParser
 from langchain_core.output_parsers import JsonOutputParser
-from typing import Dict, List, Optional
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+from langchain_core.runnables import Runnable
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple, TypeVar
+import asyncio
+import atexit
 import json
 import os
+import httpx
+import openai
+from tenacity import (
+    AsyncRetrying,
+    Retrying,
+    RetryCallState,
+    retry_if_exception_type,
+    stop_after_attempt,
+    wait_exponential_jitter,
+)
+from pydantic import TypeAdapter, ValidationError
 from ..config import settings
-from ..utils.helpers import truncate_text
+from ..schemas.quiz import QuestionModel
+from ..utils.cache import ResponseCache, make_cache_key
+from ..utils.compression import compress_text, compression_enabled
+from ..utils.helpers import dedupe_names, truncate_text
+from ..utils.ner import extract_named_entities, ner_available
+
+T = TypeVar("T")
+
+# Separates the static instructions from the per-article part of a prompt file
+PROMPT_DYNAMIC_MARKER = "## ---DYNAMIC---"
+
+# Article token budgets per prompt; truncate_text returns early for text already within them
+MAX_CONTENT_TOKENS = 3500
+TOPICS_CONTENT_TOKENS = 2000
+
+# Validates a whole generated quiz in a single pydantic-core call
+_QUESTION_LIST_ADAPTER = TypeAdapter(List[QuestionModel])
+
+# JSON mode; the streaming quiz prompt emits JSON Lines and uses the plain model
+JSON_RESPONSE_FORMAT = {"type": "json_object"}
+
+# Upper bound on concurrent OpenAI requests across the process
+MAX_CONCURRENT_LLM_REQUESTS = 10
+
+# Shared, pooled HTTP clients so concurrent requests reuse warm OpenAI connections;
+# the async one is created by LLMService since it is bound to the running event loop
+_http_limits = httpx.Limits(max_connections=1000, max_keepalive_connections=200)
+_http_timeout = httpx.Timeout(60.0, connect=5.0)
+_http_client = httpx.Client(limits=_http_limits, timeout=_http_timeout)
+atexit.register(_http_client.close)
+
+# Transient failures worth another attempt; validation errors fail fast
+_RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+    json.JSONDecodeError,
+)
+_backoff = wait_exponential_jitter(initial=1, max=10)
+
+
+def _retry_wait(retry_state: RetryCallState) -> float:
+    """Honor Retry-After on 429 responses, otherwise back off exponentially with jitter."""
+    exc = retry_state.outcome.exception()
+    if isinstance(exc, openai.RateLimitError):
+        try:
+            return min(float(exc.response.headers.get("retry-after")), 10.0)
+        except (TypeError, ValueError):
+            pass
+    return _backoff(retry_state)
+
+
+_LLM_RETRY = dict(
+    stop=stop_after_attempt(3),
+    wait=_retry_wait,
+    retry=retry_if_exception_type(_RETRYABLE_ERRORS),
+    reraise=True,
+)
+
+# Parsed LLM results keyed by prompt, shared across workers via Redis when configured
+_response_cache = ResponseCache("llm", maxsize=1024, ttl=7 * 24 * 3600)
 
 
 class LLMService:
     """Service for interacting with Google Gemini LLM."""
     
     def __init__(self):
-        """Initialize the LLM service with OpenAI model."""
-        if not settings.OPENAI_API_KEY:
-            raise ValueError("OPENAI_API_KEY not found in environment variables")
-
-        model_name = settings.LLM_MODEL
-        if model_name in {"gemini-pro", "models/gemini-pro", "gemini-1.5-flash"}:
-            # Fallback to GPT-4o mini if old Gemini models are specified
-            model_name = "gpt-4o-mini"
-
-        self.llm = ChatOpenAI(
-            model=model_name,
-            temperature=settings.LLM_TEMPERATURE,
-            openai_api_key=settings.OPENAI_API_KEY
-        )
+        """Initialize the LLM service; the OpenAI model is created on first use."""
+        self._llm: Optional[ChatOpenAI] = None
+        self._json_llm: Optional[Runnable] = None
+        self._async_openai: Optional[openai.AsyncOpenAI] = None
+        
+        # Async resources are created on first use and again after aclose(),
+        # so they always belong to the event loop that is serving requests
+        self._http_async_client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
         
         # Load prompt templates
         backend_dir = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
         self.prompts_dir = os.path.join(backend_dir, 'prompts')
         self._load_prompts()
     
+    @property
+    def llm(self) -> ChatOpenAI:
+        """
+        OpenAI chat model, created on first access.
+        
+        Raises:
+            ValueError: If OPENAI_API_KEY is not configured
+        """
+        if self._llm is None:
+            api_key = self._api_key()
+            self._llm = ChatOpenAI(
+                model=self.model_name,
+                temperature=settings.LLM_TEMPERATURE,
+                openai_api_key=api_key,
+                # langchain-openai hands a single http_client to both the sync and
+                # async SDK clients, so build them here around the shared pools
+                # Retries are handled by _LLM_RETRY, so the SDK's own are disabled
+                client=openai.OpenAI(
+                    api_key=api_key, http_client=_http_client, max_retries=0
+                ).chat.completions,
+                async_client=self.async_openai.chat.completions
+            )
+        return self._llm
+    
+    @property
+    def json_llm(self) -> Runnable:
+        """Chat model constrained to reply with a single JSON object."""
+        if self._json_llm is None:
+            self._json_llm = self.llm.bind(response_format=JSON_RESPONSE_FORMAT)
+        return self._json_llm
+    
+    @property
+    def async_openai(self) -> openai.AsyncOpenAI:
+        """
+        Async OpenAI SDK client on the shared connection pool, created on first access.
+        
+        Raises:
+            ValueError: If OPENAI_API_KEY is not configured
+        """
+        if self._async_openai is None:
+            api_key = self._api_key()
+            self._http_async_client = httpx.AsyncClient(limits=_http_limits, timeout=_http_timeout)
+            self._async_openai = openai.AsyncOpenAI(
+                api_key=api_key, http_client=self._http_async_client, max_retries=0
+            )
+        return self._async_openai
+    
+    @property
+    def _llm_semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(MAX_CONCURRENT_LLM_REQUESTS)
+        return self._semaphore
+    
+    @property
+    def model_name(self) -> str:
+        """OpenAI model used for all calls."""
+        model_name = settings.LLM_MODEL
+        if model_name in {"gemini-pro", "models/gemini-pro", "gemini-1.5-flash"}:
+            # Fallback to GPT-4o mini if old Gemini models are specified
+            model_name = "gpt-4o-mini"
+        return model_name
+    
+    def _api_key(self) -> str:
+        if not settings.OPENAI_API_KEY:
+            raise ValueError("OPENAI_API_KEY not found in environment variables")
+        return settings.OPENAI_API_KEY
+    
+    async def aclose(self):
+        """
+        Close the async HTTP client; call on application shutdown.
+        
+        The clients and semaphore are dropped too, so a later startup (e.g. a
+        lifespan restart on a new event loop) builds fresh ones on first use.
+        """
+        if self._http_async_client is not None:
+            await self._http_async_client.aclose()
+        # The chat models wrap the async client, so they are rebuilt as well
+        self._http_async_client = None
+        self._async_openai = None
+        self._llm = None
+        self._json_llm = None
+        self._semaphore = None
+    
     def _load_prompts(self):
         """Load all prompt templates from files."""
         # Main quiz generation prompt
-        main_prompt_path = os.path.join(self.prompts_dir, 'main_prompt.txt')
-        with open(main_prompt_path, 'r', encoding='utf-8') as f:
-            self.quiz_prompt_template = f.read()
+        self.quiz_system_message, self.quiz_prompt_template = self._read_prompt(
+            'main_prompt.txt'
+        )
+        
+        # Line-delimited variant of the quiz prompt for streaming
+        self.quiz_stream_system_message, self.quiz_stream_prompt_template = self._read_prompt(
+            'main_prompt_stream.txt'
+        )
         
         # Entity extraction prompt
-        entity_prompt_path = os.path.join(
-            self.prompts_dir, 'sub_prompts', 'entity_extraction.txt'
+        self.entity_system_message, self.entity_prompt_template = self._read_prompt(
+            'sub_prompts', 'entity_extraction.txt'
         )
-        with open(entity_prompt_path, 'r', encoding='utf-8') as f:
-            self.entity_prompt_template = f.read()
         
         # Summary generation prompt
-        summary_prompt_path = os.path.join(
-            self.prompts_dir, 'sub_prompts', 'summary_generation.txt'
+        self.summary_system_message, self.summary_prompt_template = self._read_prompt(
+            'sub_prompts', 'summary_generation.txt'
         )
-        with open(summary_prompt_path, 'r', encoding='utf-8') as f:
-            self.summary_prompt_template = f.read()
         
         # Related topics prompt
-        topics_prompt_path = os.path.join(
-            self.prompts_dir, 'sub_prompts', 'related_topics.txt'
+        self.topics_system_message, self.topics_prompt_template = self._read_prompt(
+            'sub_prompts', 'related_topics.txt'
+        )
+        
+        # Combined summary/entities/topics prompt
+        self.combined_system_message, self.combined_prompt_template = self._read_prompt(
+            'sub_prompts', 'combined_analysis.txt'
+        )
+        
+        # Combined prompt without entities, for when spaCy extracts them locally
+        self.summary_topics_system_message, self.summary_topics_prompt_template = self._read_prompt(
+            'sub_prompts', 'summary_topics.txt'
         )
-        with open(topics_prompt_path, 'r', encoding='utf-8') as f:
-            self.topics_prompt_template = f.read()
+    
+    def _read_prompt(self, *path_parts: str) -> Tuple[SystemMessage, str]:
+        """
+        Read a prompt file and split it into its static and per-article parts.
+        
+        Everything above PROMPT_DYNAMIC_MARKER (instructions and JSON schema)
+        becomes a system message built once here and reused for every call;
+        the part below it is a str.format template for the user message. The
+        static parts are a few hundred tokens, below the 1024-token minimum
+        for OpenAI prompt caching, so the split keeps article text out of the
+        instructions rather than earning cached-input pricing.
+        
+        Args:
+            path_parts: Path of the prompt file relative to the prompts directory
+            
+        Returns:
+            Tuple of (system message, user prompt template)
+        """
+        with open(os.path.join(self.prompts_dir, *path_parts), 'r', encoding='utf-8') as f:
+            static, dynamic = f.read().split(PROMPT_DYNAMIC_MARKER)
+        return SystemMessage(content=static.strip()), dynamic.strip()
     
     def generate_quiz(
         self, 
         title: str, 
         content: str, 
-        num_questions: int = 8
+        num_questions: int = 8,
+        use_cache: bool = True
     ) -> List[Dict]:
         """
         Generate quiz questions from article content.
@@ -79,6 +263,7 @@ class LLMService:
             title: Article title
             content: Article text content
             num_questions: Number of questions to generate
+            use_cache: Reuse a previous result for identical input
             
         Returns:
             List of question dictionaries
@@ -86,135 +271,151 @@ class LLMService:
         Raises:
             Exception: If generation fails
         """
-        # Truncate content to fit context window
-        truncated_content = truncate_text(content, max_tokens=3500)
-        
-        # Create prompt
-        prompt = self.quiz_prompt_template.format(
-            title=title,
-            content=truncated_content,
-            num_questions=num_questions
+        return self._invoke_with_retry(
+            self._quiz_prompt(title, content, num_questions),
+            lambda result: self._quiz_from_result(result, num_questions),
+            self._quiz_failure,
+            use_cache=use_cache
         )
+    
+    async def agenerate_quiz(
+        self, 
+        title: str, 
+        content: str, 
+        num_questions: int = 8,
+        use_cache: bool = True
+    ) -> List[Dict]:
+        """Async variant of generate_quiz."""
+        return await self._ainvoke_with_retry(
+            await self._abuild_prompt(self._quiz_prompt, title, content, num_questions),
+            lambda result: self._quiz_from_result(result, num_questions),
+            self._quiz_failure,
+            use_cache=use_cache
+        )
+    
+    async def astream_quiz(
+        self,
+        title: str,
+        content: str,
+        num_questions: int = 8,
+        use_cache: bool = True
+    ) -> AsyncIterator[Dict]:
+        """
+        Generate quiz questions, yielding each one as soon as the model finishes it.
         
-        # Invoke LLM with retry logic
-        for attempt in range(3):
-            try:
-                response = self.llm.invoke(prompt)
-                
-                # Parse JSON response
-                result = self._parse_json_response(response.content)
-                
-                # Validate and return questions
-                if 'quiz' in result and isinstance(result['quiz'], list):
-                    questions = result['quiz'][:num_questions]
-                    
-                    # Validate each question
-                    for q in questions:
-                        self._validate_question(q)
-                    
-                    return questions
-                else:
-                    raise ValueError("Invalid quiz format in response")
-                    
-            except Exception as e:
-                if attempt == 2:
-                    raise Exception(f"Failed to generate quiz after 3 attempts: {str(e)}")
-                continue
+        The model writes one JSON question per line; lines that fail to parse
+        or validate are dropped instead of failing the whole quiz.
+        
+        Args:
+            title: Article title
+            content: Article text content
+            num_questions: Number of questions to generate
+            use_cache: Reuse a previous result for identical input
+            
+        Yields:
+            Validated question dictionaries
+        """
+        prompt = await self._abuild_prompt(self._quiz_stream_prompt, title, content, num_questions)
+        cache_key = self._cache_key(prompt)
+        if use_cache:
+            cached = await _response_cache.aget(cache_key)
+            if cached is not None:
+                for question in cached:
+                    yield question
+                return
+        
+        questions: List[Dict] = []
+        buffer = ""
+        async with self._llm_semaphore:
+            async for chunk in self.llm.astream(prompt):
+                buffer += chunk.content
+                *lines, buffer = buffer.split("\n")
+                for line in lines:
+                    question = self._question_from_line(line)
+                    if question is not None and len(questions) < num_questions:
+                        questions.append(question)
+                        yield question
+        
+        question = self._question_from_line(buffer)
+        if question is not None and len(questions) < num_questions:
+            questions.append(question)
+            yield question
         
-        raise Exception("Failed to generate quiz")
+        if questions:
+            await _response_cache.aset(cache_key, questions)
     
-    def extract_entities(self, title: str, content: str) -> Dict[str, List[str]]:
+    def extract_entities(self, title: str, content: str, use_cache: bool = True) -> Dict[str, List[str]]:
         """
         Extract key entities from article content.
         
+        Uses local spaCy NER when it is installed and only falls back to
+        the LLM otherwise.
+        
         Args:
             title: Article title
             content: Article text content
+            use_cache: Reuse a previous result for identical input
             
         Returns:
             Dictionary with people, organizations, and locations
         """
-        # Truncate content
-        truncated_content = truncate_text(content, max_tokens=3500)
-        
-        # Create prompt
-        prompt = self.entity_prompt_template.format(
-            title=title,
-            content=truncated_content
+        entities = extract_named_entities(content)
+        if entities is not None:
+            return entities
+        return self._invoke_with_retry(
+            self._entity_prompt(title, content),
+            self._entities_from_result,
+            self._entities_failure,
+            use_cache=use_cache
+        )
+    
+    async def aextract_entities(self, title: str, content: str, use_cache: bool = True) -> Dict[str, List[str]]:
+        """Async variant of extract_entities."""
+        # NER is CPU-bound, so keep it off the event loop
+        entities = await asyncio.to_thread(extract_named_entities, content)
+        if entities is not None:
+            return entities
+        return await self._ainvoke_with_retry(
+            await self._abuild_prompt(self._entity_prompt, title, content),
+            self._entities_from_result,
+            self._entities_failure,
+            use_cache=use_cache
         )
-        
-        # Invoke LLM with retry logic
-        for attempt in range(3):
-            try:
-                response = self.llm.invoke(prompt)
-                result = self._parse_json_response(response.content)
-                
-                # Validate structure
-                if all(key in result for key in ['people', 'organizations', 'locations']):
-                    return {
-                        'people': result.get('people', [])[:10],
-                        'organizations': result.get('organizations', [])[:10],
-                        'locations': result.get('locations', [])[:10]
-                    }
-                else:
-                    raise ValueError("Invalid entity extraction format")
-                    
-            except Exception as e:
-                if attempt == 2:
-                    # Return empty structure on failure
-                    return {
-                        'people': [],
-                        'organizations': [],
-                        'locations': []
-                    }
-                continue
-        
-        return {'people': [], 'organizations': [], 'locations': []}
     
-    def generate_summary(self, title: str, content: str) -> str:
+    def generate_summary(self, title: str, content: str, use_cache: bool = True) -> str:
         """
         Generate article summary.
         
         Args:
             title: Article title
             content: Article text content
+            use_cache: Reuse a previous result for identical input
             
         Returns:
             Summary text
         """
-        # Truncate content
-        truncated_content = truncate_text(content, max_tokens=3500)
-        
-        # Create prompt
-        prompt = self.summary_prompt_template.format(
-            title=title,
-            content=truncated_content
+        return self._invoke_with_retry(
+            self._summary_prompt(title, content),
+            self._summary_from_result,
+            lambda exc: f"An article about {title}.",
+            use_cache=use_cache
+        )
+    
+    async def agenerate_summary(self, title: str, content: str, use_cache: bool = True) -> str:
+        """Async variant of generate_summary."""
+        return await self._ainvoke_with_retry(
+            await self._abuild_prompt(self._summary_prompt, title, content),
+            self._summary_from_result,
+            lambda exc: f"An article about {title}.",
+            use_cache=use_cache
         )
-        
-        # Invoke LLM
-        for attempt in range(3):
-            try:
-                response = self.llm.invoke(prompt)
-                result = self._parse_json_response(response.content)
-                
-                if 'summary' in result:
-                    return result['summary']
-                else:
-                    raise ValueError("Invalid summary format")
-                    
-            except Exception as e:
-                if attempt == 2:
-                    # Return simple summary on failure
-                    return f"An article about {title}."
-                continue
-        
-        return f"An article about {title}."
     
     def generate_related_topics(
         self, 
         title: str, 
         content: str, 
-        entities: Dict[str, List[str]]
+        entities: Dict[str, List[str]],
+        use_cache: bool = True
     ) -> List[str]:
         """
         Generate related topics for further learning.
@@ -223,104 +424,429 @@ class LLMService:
             title: Article title
             content: Article text content
             entities: Extracted entities
+            use_cache: Reuse a previous result for identical input
             
         Returns:
             List of related topic strings
         """
-        # Truncate content
-        truncated_content = truncate_text(content, max_tokens=2000)
-        
-        # Format entities for prompt
-        entities_str = f"People: {', '.join(entities.get('people', [])[:5])}\n"
-        entities_str += f"Organizations: {', '.join(entities.get('organizations', [])[:5])}\n"
-        entities_str += f"Locations: {', '.join(entities.get('locations', [])[:5])}"
-        
-        # Create prompt
-        prompt = self.topics_prompt_template.format(
-            title=title,
-            content=truncated_content,
-            entities=entities_str
+        return self._invoke_with_retry(
+            self._topics_prompt(title, content, entities),
+            self._topics_from_result,
+            lambda exc: [],
+            use_cache=use_cache
         )
-        
-        # Invoke LLM
-        for attempt in range(3):
-            try:
-                response = self.llm.invoke(prompt)
-                result = self._parse_json_response(response.content)
-                
-                if 'related_topics' in result:
-                    return result['related_topics'][:8]
-                else:
-                    raise ValueError("Invalid topics format")
-                    
-            except Exception as e:
-                if attempt == 2:
-                    return []
-                continue
-        
-        return []
     
-    def _parse_json_response(self, response_text: str) -> Dict:
+    async def agenerate_related_topics(
+        self, 
+        title: str, 
+        content: str, 
+        entities: Dict[str, List[str]],
+        use_cache: bool = True
+    ) -> List[str]:
+        """Async variant of generate_related_topics."""
+        return await self._ainvoke_with_retry(
+            await self._abuild_prompt(self._topics_prompt, title, content, entities),
+            self._topics_from_result,
+            lambda exc: [],
+            use_cache=use_cache
+        )
+    
+    def generate_combined_analysis(self, title: str, content: str, use_cache: bool = True) -> Dict:
         """
-        Parse JSON from LLM response.
+        Generate summary, key entities and related topics with a single LLM call.
+        
+        The article is sent once instead of once per task.
         
         Args:
-            response_text: Raw response from LLM
+            title: Article title
+            content: Article text content
+            use_cache: Reuse a previous result for identical input
             
         Returns:
-            Parsed JSON dictionary
+            Dictionary with summary, key_entities and related_topics
         """
-        # Try direct JSON parsing
-        try:
-            return json.loads(response_text)
-        except json.JSONDecodeError:
-            pass
-        
-        # Try to extract JSON from markdown code blocks
-        if '```json' in response_text:
-            start = response_text.find('```json') + 7
-            end = response_text.find('```', start)
-            json_str = response_text[start:end].strip()
-            return json.loads(json_str)
+        return self._invoke_with_retry(
+            self._combined_prompt(title, content),
+            self._combined_from_result,
+            lambda exc: self._combined_failure(title),
+            use_cache=use_cache
+        )
+    
+    async def agenerate_combined_analysis(self, title: str, content: str, use_cache: bool = True) -> Dict:
+        """
+        Async variant of generate_combined_analysis.
         
-        # Try to extract JSON between curly braces
-        if '{' in response_text and '}' in response_text:
-            start = response_text.find('{')
-            end = response_text.rfind('}') + 1
-            json_str = response_text[start:end]
-            return json.loads(json_str)
+        When spaCy is installed, key entities come from local NER run
+        alongside a smaller LLM call that only writes the summary and topics.
+        """
+        if not ner_available():
+            return await self._ainvoke_with_retry(
+                await self._abuild_prompt(self._combined_prompt, title, content),
+                self._combined_from_result,
+                lambda exc: self._combined_failure(title),
+                use_cache=use_cache
+            )
         
-        raise ValueError("Could not parse JSON from response")
+        entities, analysis = await asyncio.gather(
+            self.aextract_entities(title, content, use_cache=use_cache),
+            self._agenerate_summary_topics(title, content, use_cache=use_cache)
+        )
+        analysis['key_entities'] = entities
+        return analysis
+    
+    async def _agenerate_summary_topics(self, title: str, content: str, use_cache: bool = True) -> Dict:
+        return await self._ainvoke_with_retry(
+            await self._abuild_prompt(self._summary_topics_prompt, title, content),
+            self._summary_topics_from_result,
+            lambda exc: self._combined_failure(title),
+            use_cache=use_cache
+        )
     
-    def _validate_question(self, question: Dict) -> bool:
+    # ========== Batch API ==========
+    
+    async def agenerate_quiz_batch(
+        self,
+        articles: Dict[str, Tuple[str, str]],
+        num_questions: int = 8,
+        poll_interval: float = 60.0
+    ) -> Dict[str, Tuple[Optional[List[Dict]], Dict]]:
         """
-        Validate question structure.
+        Generate quizzes and analyses for many articles through the OpenAI Batch API.
+        
+        Batch requests are billed at half price but may take up to 24 hours,
+        so this is meant for backfills rather than interactive requests.
         
         Args:
-            question: Question dictionary
+            articles: Mapping of caller-chosen ID to (title, content)
+            num_questions: Number of questions per quiz
+            poll_interval: Seconds between batch status checks
             
         Returns:
-            True if valid
+            Mapping of article ID to (questions, analysis); questions is None
+            when the quiz could not be generated for that article
             
         Raises:
-            ValueError: If invalid
+            Exception: If the batch fails, expires or is cancelled
         """
-        required_fields = ['question', 'options', 'answer', 'difficulty', 'explanation']
+        # With spaCy, entities are extracted locally and left out of the analysis prompt
+        local_ner = ner_available()
+        analysis_prompt = self._summary_topics_prompt if local_ner else self._combined_prompt
+        analysis_from_result = self._summary_topics_from_result if local_ner else self._combined_from_result
         
-        for field in required_fields:
-            if field not in question:
-                raise ValueError(f"Missing field: {field}")
+        lines = []
+        for article_id, (title, content) in articles.items():
+            # Prompt compression runs a local model, so build prompts off the event loop
+            quiz_prompt = await self._abuild_prompt(self._quiz_prompt, title, content, num_questions)
+            article_analysis_prompt = await self._abuild_prompt(analysis_prompt, title, content)
+            lines.append(self._batch_line(f"{article_id}:quiz", quiz_prompt))
+            lines.append(self._batch_line(f"{article_id}:analysis", article_analysis_prompt))
         
-        if not isinstance(question['options'], list) or len(question['options']) != 4:
-            raise ValueError("Options must be a list of 4 items")
+        client = self.async_openai
+        batch_file = await client.files.create(
+            file=("quiz_batch.jsonl", "\n".join(lines).encode('utf-8')),
+            purpose="batch"
+        )
+        batch = await client.batches.create(
+            input_file_id=batch_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h"
+        )
+        
+        # Run local NER while the batch is queued
+        entities: Dict[str, Dict[str, List[str]]] = {}
+        if local_ner:
+            extracted = await asyncio.gather(*(
+                self.aextract_entities(title, content) for title, content in articles.values()
+            ))
+            entities = dict(zip(articles, extracted))
+        
+        while batch.status not in ("completed", "failed", "expired", "cancelled"):
+            await asyncio.sleep(poll_interval)
+            batch = await client.batches.retrieve(batch.id)
+        
+        if batch.status != "completed" or not batch.output_file_id:
+            raise Exception(f"Batch {batch.id} ended with status {batch.status}")
         
-        if question['answer'] not in ['A', 'B', 'C', 'D']:
-            raise ValueError("Answer must be A, B, C, or D")
+        output = await client.files.content(batch.output_file_id)
+        replies: Dict[str, str] = {}
+        for line in output.text.splitlines():
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            response = item.get("response") or {}
+            if response.get("status_code") == 200:
+                replies[item["custom_id"]] = response["body"]["choices"][0]["message"]["content"]
         
-        if question['difficulty'] not in ['easy', 'medium', 'hard']:
-            raise ValueError("Difficulty must be easy, medium, or hard")
+        results = {}
+        for article_id, (title, _) in articles.items():
+            try:
+                questions = self._quiz_from_result(
+                    self._parse_json_response(replies[f"{article_id}:quiz"]), num_questions
+                )
+            except Exception:
+                questions = None
+            try:
+                analysis = analysis_from_result(
+                    self._parse_json_response(replies[f"{article_id}:analysis"])
+                )
+            except Exception:
+                analysis = self._combined_failure(title)
+            if local_ner:
+                analysis['key_entities'] = entities[article_id]
+            results[article_id] = (questions, analysis)
+        return results
+    
+    def _batch_line(self, custom_id: str, prompt: List[BaseMessage]) -> str:
+        roles = {"system": "system", "human": "user"}
+        return json.dumps({
+            "custom_id": custom_id,
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": {
+                "model": self.model_name,
+                "temperature": settings.LLM_TEMPERATURE,
+                "response_format": JSON_RESPONSE_FORMAT,
+                "messages": [
+                    {"role": roles[message.type], "content": message.content}
+                    for message in prompt
+                ]
+            }
+        }, ensure_ascii=False)
+    
+    # ========== Prompt construction ==========
+    
+    def _quiz_prompt(self, title: str, content: str, num_questions: int) -> List[BaseMessage]:
+        # Truncate content to fit context window
+        truncated_content = self._prepare_content(content, max_tokens=MAX_CONTENT_TOKENS)
+        
+        return self._messages(self.quiz_system_message, self.quiz_prompt_template.format(
+            title=title,
+            content=truncated_content,
+            num_questions=num_questions
+        ))
+    
+    def _quiz_stream_prompt(self, title: str, content: str, num_questions: int) -> List[BaseMessage]:
+        truncated_content = self._prepare_content(content, max_tokens=MAX_CONTENT_TOKENS)
+        
+        return self._messages(self.quiz_stream_system_message, self.quiz_stream_prompt_template.format(
+            title=title,
+            content=truncated_content,
+            num_questions=num_questions
+        ))
+    
+    def _entity_prompt(self, title: str, content: str) -> List[BaseMessage]:
+        truncated_content = self._prepare_content(content, max_tokens=MAX_CONTENT_TOKENS)
+        
+        return self._messages(self.entity_system_message, self.entity_prompt_template.format(
+            title=title,
+            content=truncated_content
+        ))
+    
+    def _summary_prompt(self, title: str, content: str) -> List[BaseMessage]:
+        truncated_content = self._prepare_content(content, max_tokens=MAX_CONTENT_TOKENS)
+        
+        return self._messages(self.summary_system_message, self.summary_prompt_template.format(
+            title=title,
+            content=truncated_content
+        ))
+    
+    def _topics_prompt(self, title: str, content: str, entities: Dict[str, List[str]]) -> List[BaseMessage]:
+        truncated_content = self._prepare_content(content, max_tokens=TOPICS_CONTENT_TOKENS)
         
-        return True
+        # Format entities for prompt
+        entities_str = f"People: {', '.join(entities.get('people', [])[:5])}\n"
+        entities_str += f"Organizations: {', '.join(entities.get('organizations', [])[:5])}\n"
+        entities_str += f"Locations: {', '.join(entities.get('locations', [])[:5])}"
+        
+        return self._messages(self.topics_system_message, self.topics_prompt_template.format(
+            title=title,
+            content=truncated_content,
+            entities=entities_str
+        ))
+    
+    def _combined_prompt(self, title: str, content: str) -> List[BaseMessage]:
+        truncated_content = self._prepare_content(content, max_tokens=MAX_CONTENT_TOKENS)
+        
+        return self._messages(self.combined_system_message, self.combined_prompt_template.format(
+            title=title,
+            content=truncated_content
+        ))
+    
+    def _summary_topics_prompt(self, title: str, content: str) -> List[BaseMessage]:
+        truncated_content = self._prepare_content(content, max_tokens=MAX_CONTENT_TOKENS)
+        
+        return self._messages(self.summary_topics_system_message, self.summary_topics_prompt_template.format(
+            title=title,
+            content=truncated_content
+        ))
+    
+    def _prepare_content(self, content: str, max_tokens: int) -> str:
+        # Truncate to the prompt budget, then compress when LLMLingua is available
+        return compress_text(truncate_text(content, max_tokens=max_tokens))
+    
+    async def _abuild_prompt(self, builder: Callable[..., List[BaseMessage]], *args) -> List[BaseMessage]:
+        # Compression runs a local model, so keep it off the event loop
+        if compression_enabled():
+            return await asyncio.to_thread(builder, *args)
+        return builder(*args)
+    
+    def _messages(self, system_message: SystemMessage, user_prompt: str) -> List[BaseMessage]:
+        return [system_message, HumanMessage(content=user_prompt)]
+    
+    # ========== Response handling ==========
+    
+    def _quiz_from_result(self, result: Dict, num_questions: int) -> List[Dict]:
+        if 'quiz' in result and isinstance(result['quiz'], list):
+            # Validate all questions in one pass; raises ValidationError (a ValueError)
+            questions = _QUESTION_LIST_ADAPTER.validate_python(result['quiz'][:num_questions])
+            return [question.model_dump() for question in questions]
+        raise ValueError("Invalid quiz format in response")
+    
+    def _question_from_line(self, line: str) -> Optional[Dict]:
+        line = line.strip().rstrip(',')
+        if not line.startswith('{'):
+            return None  # blank line, code fence or stray prose
+        try:
+            # Parses and validates the JSON line in a single step
+            return QuestionModel.model_validate_json(line).model_dump()
+        except ValidationError:
+            return None
+    
+    def _quiz_failure(self, exc: Exception) -> List[Dict]:
+        raise Exception(f"Failed to generate quiz: {str(exc)}")
+    
+    def _entities_from_result(self, result: Dict) -> Dict[str, List[str]]:
+        if all(key in result for key in ['people', 'organizations', 'locations']):
+            return {
+                'people': dedupe_names(result.get('people', [])),
+                'organizations': dedupe_names(result.get('organizations', [])),
+                'locations': dedupe_names(result.get('locations', []))
+            }
+        raise ValueError("Invalid entity extraction format")
+    
+    def _entities_failure(self, exc: Exception) -> Dict[str, List[str]]:
+        # Return empty structure on failure
+        return {'people': [], 'organizations': [], 'locations': []}
+    
+    def _summary_from_result(self, result: Dict) -> str:
+        if 'summary' in result:
+            return result['summary']
+        raise ValueError("Invalid summary format")
+    
+    def _topics_from_result(self, result: Dict) -> List[str]:
+        if 'related_topics' in result:
+            return dedupe_names(result['related_topics'], limit=8)
+        raise ValueError("Invalid topics format")
+    
+    def _combined_from_result(self, result: Dict) -> Dict:
+        if not all(key in result for key in ['summary', 'key_entities', 'related_topics']):
+            raise ValueError("Invalid combined analysis format")
+        return {
+            'summary': self._summary_from_result(result),
+            'key_entities': self._entities_from_result(result['key_entities']),
+            'related_topics': self._topics_from_result(result)
+        }
+    
+    def _summary_topics_from_result(self, result: Dict) -> Dict:
+        return {
+            'summary': self._summary_from_result(result),
+            'related_topics': self._topics_from_result(result)
+        }
+    
+    def _combined_failure(self, title: str) -> Dict:
+        return {
+            'summary': f"An article about {title}.",
+            'key_entities': self._entities_failure(None),
+            'related_topics': []
+        }
+    
+    # ========== LLM invocation ==========
+    
+    def _invoke_with_retry(
+        self,
+        prompt: List[BaseMessage],
+        handle: Callable[[Dict], T],
+        on_failure: Callable[[Exception], T],
+        use_cache: bool = True
+    ) -> T:
+        """
+        Invoke the LLM, parse its JSON and hand it to ``handle``.
+        
+        Rate limits, connection errors, 5xx responses and malformed JSON are
+        retried up to 3 attempts with exponential backoff; anything else
+        (e.g. a ValueError from ``handle``) goes straight to ``on_failure``.
+        Successful results are cached by prompt and model; fallbacks from
+        ``on_failure`` are not.
+        
+        Args:
+            prompt: System and user messages
+            handle: Converts the parsed JSON into the return value; raises if invalid
+            on_failure: Produces the return value (or raises) after the last failed attempt
+            use_cache: Look up and store the result in the response cache
+        """
+        cache_key = self._cache_key(prompt)
+        if use_cache:
+            cached = _response_cache.get(cache_key)
+            if cached is not None:
+                return cached
+        try:
+            result = Retrying(**_LLM_RETRY)(self._invoke_once, prompt, handle)
+        except Exception as e:
+            return on_failure(e)
+        _response_cache.set(cache_key, result)
+        return result
+    
+    async def _ainvoke_with_retry(
+        self,
+        prompt: List[BaseMessage],
+        handle: Callable[[Dict], T],
+        on_failure: Callable[[Exception], T],
+        use_cache: bool = True
+    ) -> T:
+        """Async variant of _invoke_with_retry, bounded by the LLM request semaphore."""
+        cache_key = self._cache_key(prompt)
+        if use_cache:
+            cached = await _response_cache.aget(cache_key)
+            if cached is not None:
+                return cached
+        try:
+            result = await AsyncRetrying(**_LLM_RETRY)(self._ainvoke_once, prompt, handle)
+        except Exception as e:
+            return on_failure(e)
+        await _response_cache.aset(cache_key, result)
+        return result
+    
+    def _invoke_once(self, prompt: List[BaseMessage], handle: Callable[[Dict], T]) -> T:
+        response = self.json_llm.invoke(prompt)
+        return handle(self._parse_json_response(response.content))
+    
+    async def _ainvoke_once(self, prompt: List[BaseMessage], handle: Callable[[Dict], T]) -> T:
+        # The semaphore is released while tenacity sleeps between attempts
+        async with self._llm_semaphore:
+            response = await self.json_llm.ainvoke(prompt)
+        return handle(self._parse_json_response(response.content))
+    
+    def _cache_key(self, prompt: List[BaseMessage]) -> str:
+        return make_cache_key(
+            self.model_name,
+            settings.LLM_TEMPERATURE,
+            [(message.type, message.content) for message in prompt]
+        )
+    
+    def _parse_json_response(self, response_text: str) -> Dict:
+        """
+        Parse JSON from LLM response.
+        
+        Replies are requested in JSON mode, so the text is parsed as-is;
+        a JSONDecodeError is left to the retry policy.
+        
+        Args:
+            response_text: Raw response from LLM
+            
+        Returns:
+            Parsed JSON dictionary
+        """
+        return json.loads(response_text)
 
 
 # Create singleton instance
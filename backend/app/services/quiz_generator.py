@@ -3,13 +3,26 @@ Quiz generation service that orchestrates scraping, LLM, and database operations
 Stores complete quiz data as JSON instead of relational tables.
 """
 
-from sqlalchemy.orm import Session
-from typing import Dict, List, Optional
+import asyncio
+import hashlib
+from datetime import datetime, timedelta, timezone
+
+import anyio
+from cachetools import TTLCache
+from sqlalchemy import Row, Select, column, delete, func, select, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncResult, AsyncSession
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 
 from ..models.quiz import Quiz
 from .scraper import scraper, ScraperError
-from .llm_service import llm_service
-from ..utils.helpers import sanitize_url, extract_sections_list
+from .llm_service import MAX_CONTENT_TOKENS, llm_service
+from ..utils.helpers import build_fts_query, sanitize_url, extract_sections_list, truncate_text
+
+
+# Age after which another request's unfinished placeholder is considered abandoned
+CLAIM_TIMEOUT_SECONDS = 300
+CLAIM_POLL_SECONDS = 1.0
 
 
 class QuizGenerationError(Exception):
@@ -20,97 +33,336 @@ class QuizGenerationError(Exception):
 class QuizGeneratorService:
     """Service that builds quizzes as JSON blobs from article URLs."""
 
-    def generate_quiz(self, db: Session, url: str, num_questions: int = 8) -> Quiz:
+    def __init__(self):
+        # Serialized GET /quiz/{id} bodies keyed by quiz ID; dropped whenever
+        # the quiz is saved or deleted so no caller has to invalidate it
+        self.quiz_cache: TTLCache = TTLCache(maxsize=1024, ttl=300)
+
+    async def generate_quiz(self, db: AsyncSession, url: str, num_questions: int = 8) -> Quiz:
         """Generate a quiz for the URL and persist it."""
         try:
             normalized_url = sanitize_url(url)
 
-            existing_quiz = db.query(Quiz).filter(Quiz.url == normalized_url).first()
+            quiz_id, existing_quiz = await self._claim_url(db, normalized_url)
             if existing_quiz:
                 return existing_quiz
 
-            scraped_data = self._scrape_content(normalized_url)
-            questions = self._generate_questions(scraped_data, num_questions)
-            entities = self._extract_entities(scraped_data)
-            summary = self._generate_summary(scraped_data)
-            related_topics = self._generate_related_topics(scraped_data, entities)
+            try:
+                scraped_data = await self._scrape_content(normalized_url)
+
+                # Questions and the combined summary/entities/topics analysis are independent
+                questions, analysis = await asyncio.gather(
+                    self._generate_questions(scraped_data, num_questions),
+                    self._analyze_content(scraped_data)
+                )
+                quiz_json = self._build_quiz_json(
+                    normalized_url,
+                    scraped_data,
+                    questions,
+                    analysis['key_entities'],
+                    analysis['summary'],
+                    analysis['related_topics']
+                )
+
+                return await self._complete_claim(db, quiz_id, scraped_data, quiz_json)
+            except BaseException:
+                await self._release_claim_shielded(db, quiz_id)
+                raise
+
+        except QuizGenerationError:
+            await db.rollback()
+            raise
+        except Exception as exc:
+            await db.rollback()
+            raise QuizGenerationError(f"Quiz generation failed: {str(exc)}")
+
+    async def stream_quiz(
+        self,
+        db: AsyncSession,
+        url: str,
+        num_questions: int = 8
+    ) -> AsyncIterator[Tuple[str, object]]:
+        """
+        Generate a quiz for the URL, yielding questions as the LLM produces them.
+
+        Yields ``("scraped", dict)`` with the article title and word count,
+        ``("question", dict)`` for each question, then ``("quiz", Quiz)``
+        once the complete quiz has been persisted. An already stored quiz is
+        replayed as its questions and the quiz.
+
+        Raises:
+            QuizGenerationError: If scraping, generation or saving fails
+        """
+        normalized_url = sanitize_url(url)
+
+        quiz_id, existing_quiz = await self._claim_url(db, normalized_url)
+        if existing_quiz:
+            for question in existing_quiz.quiz_data.get('quiz', []):
+                yield "question", question
+            yield "quiz", existing_quiz
+            return
+
+        try:
+            scraped_data = await self._scrape_content(normalized_url)
+            yield "scraped", {
+                'title': scraped_data.get('title', ''),
+                'word_count': scraped_data.get('word_count', 0)
+            }
+
+            # The analysis call runs while questions stream in
+            analysis_task = asyncio.create_task(self._analyze_content(scraped_data))
+            try:
+                questions: List[Dict] = []
+                try:
+                    async for question in llm_service.astream_quiz(
+                        title=scraped_data.get('title', ''),
+                        content=scraped_data['llm_content'],
+                        num_questions=num_questions
+                    ):
+                        questions.append(question)
+                        yield "question", question
+                except Exception as exc:
+                    raise QuizGenerationError(f"LLM quiz generation failed: {str(exc)}")
+                if not questions:
+                    raise QuizGenerationError("LLM quiz generation failed: no valid questions returned")
+
+                analysis = await analysis_task
+            finally:
+                analysis_task.cancel()
+
             quiz_json = self._build_quiz_json(
                 normalized_url,
                 scraped_data,
                 questions,
-                entities,
-                summary,
-                related_topics
+                analysis['key_entities'],
+                analysis['summary'],
+                analysis['related_topics']
             )
 
-            quiz = Quiz(
-                url=normalized_url,
-                title=scraped_data.get('title', ''),
-                quiz_data=quiz_json
+            try:
+                quiz = await self._complete_claim(db, quiz_id, scraped_data, quiz_json)
+            except QuizGenerationError:
+                raise
+            except Exception as exc:
+                raise QuizGenerationError(f"Quiz generation failed: {str(exc)}")
+        except BaseException:
+            # Also covers the client disconnecting mid-stream
+            await self._release_claim_shielded(db, quiz_id)
+            raise
+
+        yield "quiz", quiz
+
+    async def generate_quiz_batch(
+        self,
+        db: AsyncSession,
+        urls: List[str],
+        num_questions: int = 8
+    ) -> Tuple[List[Quiz], Dict[str, str]]:
+        """
+        Generate quizzes for many URLs through the OpenAI Batch API and persist them.
+
+        For backfills and scheduled jobs: batch requests cost half as much but
+        may take up to 24 hours, so interactive requests use generate_quiz.
+
+        Returns:
+            The newly created quizzes, and a mapping of URL to failure reason
+            for URLs that were skipped
+        """
+        normalized_urls = list(dict.fromkeys(sanitize_url(url) for url in urls))
+        result = await db.execute(select(Quiz.url).where(Quiz.url.in_(normalized_urls)))
+        existing_urls = set(result.scalars().all())
+
+        failures: Dict[str, str] = {}
+        scraped: Dict[str, Dict] = {}
+        new_urls = [url for url in normalized_urls if url not in existing_urls]
+        pages = await scraper.scrape_urls(new_urls, return_exceptions=True)
+        for url, page in zip(new_urls, pages):
+            if isinstance(page, Exception):
+                failures[url] = str(self._scraping_error(page))
+            else:
+                scraped[url] = self._with_llm_content(page)
+
+        if not scraped:
+            return [], failures
+
+        # Batch custom IDs are limited in length, so key articles by URL hash
+        ids = {hashlib.sha256(url.encode('utf-8')).hexdigest()[:32]: url for url in scraped}
+        try:
+            results = await llm_service.agenerate_quiz_batch(
+                {
+                    article_id: (scraped[url].get('title', ''), scraped[url]['llm_content'])
+                    for article_id, url in ids.items()
+                },
+                num_questions=num_questions
+            )
+        except Exception as exc:
+            raise QuizGenerationError(f"Batch quiz generation failed: {str(exc)}")
+
+        rows = []
+        for article_id, (questions, analysis) in results.items():
+            url = ids[article_id]
+            if not questions:
+                failures[url] = "LLM quiz generation failed"
+                continue
+            quiz_json = self._build_quiz_json(
+                url,
+                scraped[url],
+                questions,
+                analysis['key_entities'],
+                analysis['summary'],
+                analysis['related_topics']
             )
-            db.add(quiz)
-            db.commit()
-            db.refresh(quiz)
+            rows.append({'url': url, 'title': scraped[url].get('title', ''), 'quiz_data': quiz_json})
 
-            return quiz
+        if not rows:
+            return [], failures
 
-        except QuizGenerationError:
-            db.rollback()
-            raise
+        # One multi-row INSERT ... RETURNING instead of a unit-of-work flush per quiz
+        try:
+            result = await db.scalars(
+                self._insert(db)(Quiz)
+                .on_conflict_do_nothing(index_elements=['url'])
+                .returning(Quiz),
+                rows
+            )
+            quizzes = list(result)
+            await db.commit()
         except Exception as exc:
-            db.rollback()
+            await db.rollback()
             raise QuizGenerationError(f"Quiz generation failed: {str(exc)}")
 
-    def _scrape_content(self, url: str) -> Dict:
+        return quizzes, failures
+
+    def _insert(self, db: AsyncSession):
+        # Dialect insert() constructs are the ones that support ON CONFLICT
+        if db.get_bind().dialect.name == "postgresql":
+            return postgresql.insert
+        return sqlite.insert
+
+    async def _claim_url(self, db: AsyncSession, url: str) -> Tuple[Optional[int], Optional[Quiz]]:
+        """
+        Reserve the URL for generation, or return the quiz already stored for it.
+
+        A placeholder row (NULL title) is inserted with ON CONFLICT DO NOTHING,
+        so concurrent requests for the same URL cannot both generate it; the
+        loser waits for the winner's quiz. A placeholder older than
+        CLAIM_TIMEOUT_SECONDS is treated as abandoned and taken over.
+
+        Returns:
+            (placeholder ID, None) if this request should generate the quiz,
+            or (None, quiz) with the completed quiz
+        """
+        while True:
+            quiz_id = await db.scalar(
+                self._insert(db)(Quiz)
+                .values(url=url, title=None, quiz_data={})
+                .on_conflict_do_nothing(index_elements=['url'])
+                .returning(Quiz.id)
+            )
+            # Commit right away so the claim is visible and no write lock is held
+            await db.commit()
+            if quiz_id is not None:
+                return quiz_id, None
+
+            existing_quiz = await db.scalar(
+                select(Quiz)
+                .where(Quiz.url == url)
+                .execution_options(populate_existing=True)
+            )
+            if existing_quiz is not None and existing_quiz.title is not None:
+                return None, existing_quiz
+
+            if existing_quiz is not None:
+                # Take over the placeholder only if it is older than the timeout;
+                # otherwise its owner is still generating, so wait for it
+                stale_before = datetime.now(timezone.utc) - timedelta(seconds=CLAIM_TIMEOUT_SECONDS)
+                if not await self._release_claim(db, existing_quiz.id, created_before=stale_before):
+                    await asyncio.sleep(CLAIM_POLL_SECONDS)
+
+    async def _complete_claim(
+        self,
+        db: AsyncSession,
+        quiz_id: int,
+        scraped_data: Dict,
+        quiz_json: Dict
+    ) -> Quiz:
+        quiz = await db.get(Quiz, quiz_id)
+        if quiz is None:
+            raise QuizGenerationError("Quiz generation failed: the pending quiz was removed")
+        quiz.title = scraped_data.get('title') or ''
+        quiz.quiz_data = quiz_json
+        await db.commit()
+        self.quiz_cache.pop(quiz_id, None)
+        await db.refresh(quiz)
+        return quiz
+
+    async def _release_claim(
+        self,
+        db: AsyncSession,
+        quiz_id: int,
+        created_before: Optional[datetime] = None
+    ) -> bool:
+        """Delete a placeholder (only one created before ``created_before``, if given)."""
+        await db.rollback()
+        conditions = [Quiz.id == quiz_id, Quiz.title.is_(None)]
+        if created_before is not None:
+            conditions.append(Quiz.created_at < created_before)
+        result = await db.execute(delete(Quiz).where(*conditions))
+        await db.commit()
+        return result.rowcount > 0
+
+    async def _release_claim_shielded(self, db: AsyncSession, quiz_id: int):
+        # Starlette cancels the stream's task scope on disconnect and keeps
+        # cancelling every await inside it, so the cleanup must be shielded
+        with anyio.CancelScope(shield=True):
+            await self._release_claim(db, quiz_id)
+
+    async def _scrape_content(self, url: str) -> Dict:
         try:
-            return scraper.scrape_url(url)
-        except ScraperError as exc:
-            raise QuizGenerationError(f"Scraping failed: {str(exc)}")
+            scraped_data = await scraper.ascrape_url(url)
         except Exception as exc:
-            raise QuizGenerationError(f"Unexpected scraping error: {str(exc)}")
+            raise self._scraping_error(exc)
+        return self._with_llm_content(scraped_data)
 
-    def _generate_questions(self, scraped_data: Dict, num_questions: int) -> List[Dict]:
+    def _scraping_error(self, exc: Exception) -> QuizGenerationError:
+        if isinstance(exc, ScraperError):
+            return QuizGenerationError(f"Scraping failed: {str(exc)}")
+        return QuizGenerationError(f"Unexpected scraping error: {str(exc)}")
+
+    def _with_llm_content(self, scraped_data: Dict) -> Dict:
+        # Truncate once here; the LLM prompts all share this budget
+        scraped_data['llm_content'] = truncate_text(
+            scraped_data.get('full_text', ''), max_tokens=MAX_CONTENT_TOKENS
+        )
+        return scraped_data
+
+    async def _generate_questions(self, scraped_data: Dict, num_questions: int) -> List[Dict]:
         try:
-            return llm_service.generate_quiz(
+            return await llm_service.agenerate_quiz(
                 title=scraped_data.get('title', ''),
-                content=scraped_data.get('full_text', ''),
+                content=scraped_data['llm_content'],
                 num_questions=num_questions
             )
         except Exception as exc:
             raise QuizGenerationError(f"LLM quiz generation failed: {str(exc)}")
 
-    def _extract_entities(self, scraped_data: Dict) -> Dict[str, List[str]]:
+    async def _analyze_content(self, scraped_data: Dict) -> Dict:
         try:
-            return llm_service.extract_entities(
+            return await llm_service.agenerate_combined_analysis(
                 title=scraped_data.get('title', ''),
-                content=scraped_data.get('full_text', '')
+                content=scraped_data['llm_content']
             )
         except Exception:
             return {
-                'people': [],
-                'organizations': [],
-                'locations': []
+                'summary': "",
+                'key_entities': {
+                    'people': [],
+                    'organizations': [],
+                    'locations': []
+                },
+                'related_topics': []
             }
 
-    def _generate_summary(self, scraped_data: Dict) -> str:
-        try:
-            return llm_service.generate_summary(
-                title=scraped_data.get('title', ''),
-                content=scraped_data.get('full_text', '')
-            )
-        except Exception:
-            return ""
-
-    def _generate_related_topics(self, scraped_data: Dict, entities: Dict[str, List[str]]) -> List[str]:
-        try:
-            return llm_service.generate_related_topics(
-                title=scraped_data.get('title', ''),
-                content=scraped_data.get('full_text', ''),
-                entities=entities
-            )
-        except Exception:
-            return []
-
     def _build_quiz_json(
         self,
         url: str,
@@ -130,28 +382,94 @@ class QuizGeneratorService:
             "related_topics": related_topics
         }
 
-    def get_quiz_by_id(self, db: Session, quiz_id: int) -> Optional[Quiz]:
-        return db.query(Quiz).filter(Quiz.id == quiz_id).first()
+    async def get_quiz_by_id(self, db: AsyncSession, quiz_id: int) -> Optional[Quiz]:
+        result = await db.execute(
+            select(Quiz).where(Quiz.id == quiz_id, Quiz.title.is_not(None))
+        )
+        return result.scalars().first()
 
-    def get_all_quizzes(
-        self,
-        db: Session,
-        page: int = 1,
-        limit: int = 20,
-        search: Optional[str] = None
-    ) -> tuple[List[Quiz], int]:
-        query = db.query(Quiz)
-        if search:
+    async def delete_quiz(self, db: AsyncSession, quiz_id: int) -> bool:
+        """Delete a completed quiz in a single statement; return False if it does not exist."""
+        result = await db.execute(
+            delete(Quiz).where(Quiz.id == quiz_id, Quiz.title.is_not(None))
+        )
+        await db.commit()
+        self.quiz_cache.pop(quiz_id, None)
+        return result.rowcount > 0
+
+    def _history_filters(self, db: AsyncSession, search: Optional[str]) -> list:
+        # Pending quizzes (NULL title) are still being generated
+        filters = [Quiz.title.is_not(None)]
+        # Trigram FTS needs at least three characters; shorter terms use ILIKE
+        sqlite_fts = search and db.get_bind().dialect.name == "sqlite"
+        fts_query = build_fts_query(search) if sqlite_fts else ''
+        if fts_query:
+            matches = text(
+                "SELECT rowid FROM quizzes_fts WHERE quizzes_fts MATCH :q"
+            ).bindparams(q=fts_query).columns(column("rowid"))
+            filters.append(Quiz.id.in_(matches))
+        elif search:
             search_term = f"%{search}%"
-            query = query.filter(
+            filters.append(
                 (Quiz.title.ilike(search_term)) | (Quiz.url.ilike(search_term))
             )
+        return filters
 
-        total = query.count()
+    def _history_query(self, filters: list, page: int, limit: int) -> Select:
         offset = (page - 1) * limit
-        quizzes = query.order_by(Quiz.created_at.desc()).offset(offset).limit(limit).all()
+        return (
+            select(
+                Quiz.id,
+                Quiz.url,
+                Quiz.title,
+                # JSON paths compile per dialect (json_extract on SQLite, ->/->> on PostgreSQL)
+                Quiz.quiz_data['summary'].as_string().label('summary'),
+                func.json_array_length(Quiz.quiz_data['quiz']).label('question_count'),
+                Quiz.created_at,
+                func.count().over().label('total')
+            )
+            .where(*filters)
+            .order_by(Quiz.created_at.desc())
+            .offset(offset)
+            .limit(limit)
+        )
+
+    async def _history_total(
+        self,
+        db: AsyncSession,
+        filters: list,
+        first_row: Optional[Row],
+        page: int
+    ) -> int:
+        if first_row is not None:
+            return first_row.total
+        if page > 1:
+            # Past the last page the window has no rows to report on
+            return await db.scalar(select(func.count(Quiz.id)).where(*filters))
+        return 0
+
+    async def stream_quizzes(
+        self,
+        db: AsyncSession,
+        page: int = 1,
+        limit: int = 20,
+        search: Optional[str] = None
+    ) -> tuple[AsyncResult, Optional[Row], int]:
+        """
+        Start streaming one page of quiz history rows.
+
+        Only the columns needed for list items are selected; summary and
+        question count are read inside the database. Rows are pulled from the
+        cursor as they are consumed. The first row is fetched up front to
+        learn the total (from a COUNT(*) OVER () window), so it is returned
+        separately from the remaining result.
+        """
+        filters = self._history_filters(db, search)
+        result = await db.stream(self._history_query(filters, page, limit))
+        first_row = await result.fetchone()
+        total = await self._history_total(db, filters, first_row, page)
 
-        return quizzes, total
+        return result, first_row, total
 
 
 quiz_service = QuizGeneratorService()
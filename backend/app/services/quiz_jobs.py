@@ -0,0 +1,129 @@
+"""
+Background quiz generation jobs.
+A job runs QuizGeneratorService.stream_quiz in its own task and records each
+event, so clients can follow progress (e.g. over SSE) without holding the
+request that started it open.
+"""
+
+import asyncio
+import uuid
+from typing import AsyncIterator, List, Set, Tuple
+
+from cachetools import TTLCache
+
+from ..database import SessionLocal
+from .quiz_generator import quiz_service
+
+
+class QuizJobNotFoundError(Exception):
+    """Raised when a job ID is unknown or has expired."""
+    pass
+
+
+class QuizJob:
+    """A single quiz generation run and the events it has produced so far."""
+
+    def __init__(self, url: str, num_questions: int):
+        self.id = uuid.uuid4().hex
+        self.url = url
+        self.num_questions = num_questions
+        # (kind, payload): "scraped"/"question" dicts, "quiz" -> Quiz, "error" -> Exception
+        self.events: List[Tuple[str, object]] = []
+        self.done = False
+        self._updated = asyncio.Event()
+
+    def publish(self, kind: str, payload: object):
+        self.events.append((kind, payload))
+        self._notify()
+
+    def finish(self):
+        self.done = True
+        self._notify()
+
+    def _notify(self):
+        # Wake current followers and arm a fresh event for the next update
+        self._updated.set()
+        self._updated = asyncio.Event()
+
+    async def follow(self, start: int = 0) -> AsyncIterator[Tuple[int, str, object]]:
+        """
+        Yield events from index ``start`` onwards, waiting for new ones until the job ends.
+
+        Args:
+            start: Index of the first event to yield (for resuming)
+
+        Yields:
+            Tuples of (event index, kind, payload)
+        """
+        index = start
+        while True:
+            while index < len(self.events):
+                kind, payload = self.events[index]
+                yield index, kind, payload
+                index += 1
+            if self.done:
+                return
+            await self._updated.wait()
+
+
+class QuizJobManager:
+    """Starts quiz jobs as asyncio tasks and keeps recent jobs for an hour."""
+
+    def __init__(self, maxsize: int = 1024, ttl: int = 3600):
+        self._jobs: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._tasks: Set[asyncio.Task] = set()
+
+    def start(self, url: str, num_questions: int = 8) -> QuizJob:
+        """
+        Start generating a quiz in the background.
+
+        Args:
+            url: Article URL
+            num_questions: Number of questions to generate
+
+        Returns:
+            The new job
+        """
+        job = QuizJob(url, num_questions)
+        self._jobs[job.id] = job
+        task = asyncio.create_task(self._run(job))
+        # Hold a reference so the task is not garbage collected mid-run
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    def get(self, job_id: str) -> QuizJob:
+        """
+        Look up a job by ID.
+
+        Raises:
+            QuizJobNotFoundError: If the job is unknown or has expired
+        """
+        job = self._jobs.get(job_id)
+        if job is None:
+            raise QuizJobNotFoundError(f"Job {job_id} not found")
+        return job
+
+    async def shutdown(self):
+        """Cancel running jobs; call once on application shutdown."""
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def _run(self, job: QuizJob):
+        try:
+            async with SessionLocal() as db:
+                async for kind, payload in quiz_service.stream_quiz(
+                    db=db,
+                    url=job.url,
+                    num_questions=job.num_questions
+                ):
+                    job.publish(kind, payload)
+        except Exception as exc:
+            job.publish("error", exc)
+        finally:
+            job.finish()
+
+
+# Create singleton instance
+quiz_jobs = QuizJobManager()
@@ -3,12 +3,123 @@ Web scraping service for extracting content from URLs.
 Handles various website formats with special support for Wikipedia.
 """
 
-import requests
+import asyncio
+import codecs
+import copy
+import logging
+import socket
+import threading
+import aiohttp
+from aiohttp.abc import AbstractResolver
+from aiohttp.resolver import ThreadedResolver
+import httpx
 from bs4 import BeautifulSoup
-from typing import Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from cachetools import TTLCache
+from typing import Dict, List, Mapping, Optional, Tuple
 import re
-from urllib.parse import urlparse
+from itertools import takewhile
+from urllib.parse import ParseResult, urlparse
 from ..config import settings
+from ..utils.cache import ResponseCache, make_cache_key
+from ..utils.helpers import sanitize_url
+
+try:
+    import h2  # noqa: F401
+except ImportError:  # h2 is optional; httpx falls back to HTTP/1.1
+    h2 = None
+
+try:
+    import brotli  # noqa: F401
+except ImportError:  # brotli is optional; only gzip/deflate are requested
+    brotli = None
+
+
+logger = logging.getLogger(__name__)
+
+# Parsed articles shared across workers (Redis) and restarts (disk) for a day
+_scrape_cache = ResponseCache(
+    "scrape",
+    maxsize=0,
+    ttl=24 * 3600,
+    disk_dir=settings.SCRAPE_CACHE_DIR or None
+)
+
+# Hosts validate_url refuses (internal networks / cloud metadata), as netloc
+# prefixes; a tuple so a single str.startswith call checks them all
+BLOCKED_PREFIXES = (
+    'localhost', '127.0.0.1', '0.0.0.0',
+    '10.', '172.16.', '192.168.',
+    'metadata.google.internal'
+)
+
+# Simultaneous page fetches per scrape_urls call
+SCRAPE_CONCURRENCY = 16
+
+# Seconds a resolved host address is reused by scrape_urls
+DNS_CACHE_TTL = 600
+
+# Retries of a failed or dropped connection in scrape_urls, matching the sync
+# transport's retries=2; waits double from FETCH_RETRY_BACKOFF seconds
+FETCH_RETRIES = 2
+FETCH_RETRY_BACKOFF = 0.3
+
+# Everything stripped from a Wikipedia article body in one select() pass
+_WIKIPEDIA_NOISE_SELECTOR = (
+    'script, style, nav, footer, aside, '
+    'span.mw-editsection, span.reference, sup.reference, '
+    'table.infobox, table.navbox, table.vertical-navbox, table.sidebar'
+)
+
+# Compiled once for _clean_text and _scrape_generic
+_BRACKET_RE = re.compile(r'\[(?:\d+|edit|citation needed)\]')
+_WS_RE = re.compile(r'\s+')
+_CONTENT_CLASS_RE = re.compile(r'content|article|post', re.I)
+
+
+class _CachingResolver(AbstractResolver):
+    """
+    DNS resolver that remembers answers across ClientSessions.
+    
+    TCPConnector's own DNS cache lives only as long as the connector; this one
+    is shared, so a session recreated for a new event loop skips getaddrinfo.
+    """
+    
+    def __init__(self, ttl: int):
+        self._hosts: TTLCache = TTLCache(maxsize=1024, ttl=ttl)
+    
+    async def resolve(self, host: str, port: int = 0, family: int = socket.AF_INET) -> List[Dict]:
+        key = (host, port, family)
+        hosts = self._hosts.get(key)
+        if hosts is None:
+            hosts = await ThreadedResolver().resolve(host, port, family)
+            self._hosts[key] = hosts
+        return hosts
+    
+    async def close(self) -> None:
+        pass
+
+
+_dns_resolver = _CachingResolver(ttl=DNS_CACHE_TTL)
+
+
+@lru_cache(maxsize=1024)
+def _clean_text(text: str) -> str:
+    # Remove citation brackets, then collapse whitespace. Cached because each
+    # Wikipedia paragraph is cleaned for full_text and again for its section,
+    # and headings/boilerplate repeat across pages.
+    return _WS_RE.sub(' ', _BRACKET_RE.sub('', text)).strip()
+
+
+def _is_wikipedia_host(hostname: Optional[str]) -> bool:
+    # hostname is already lower-cased and stripped of port/credentials by urlparse
+    return bool(hostname) and (hostname == 'wikipedia.org' or hostname.endswith('.wikipedia.org'))
+
+
+def _is_not_heading(node) -> bool:
+    # NavigableString siblings have name None
+    return node.name not in ('h2', 'h3')
 
 
 class ScraperError(Exception):
@@ -24,10 +135,89 @@ class WebScraper:
             'User-Agent': settings.USER_AGENT,
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
             'Accept-Language': 'en-US,en;q=0.5',
+            # Both HTTP clients decompress transparently; only offer br if we can decode it
+            'Accept-Encoding': 'gzip, deflate, br' if brotli is not None else 'gzip, deflate',
         }
         self.timeout = settings.REQUEST_TIMEOUT
+        
+        # Parsed articles by sanitized URL, in front of the shared _scrape_cache
+        self._cache: TTLCache = TTLCache(maxsize=256, ttl=3600)
+        
+        # (If-None-Match/If-Modified-Since headers, parsed article) by sanitized URL,
+        # kept past the cache TTLs so an expired article is revalidated, not refetched
+        self._validators: TTLCache = TTLCache(maxsize=256, ttl=7 * 24 * 3600)
+        
+        # cachetools caches are not thread-safe, and scrape_many shares them across threads
+        self._cache_lock = threading.Lock()
+        
+        # Keep-alive HTTP/2 client for the sync path (scrape_url/scrape_many, used by
+        # scripts and the CLI): repeat scrapes of a host share one TCP/TLS connection,
+        # multiplexing requests over it when h2 is installed. The API scrapes through
+        # scrape_urls on aiohttp, which only speaks HTTP/1.1 and keeps its own pool.
+        # Created lazily so the scraper is usable again after close()
+        self._client: Optional[httpx.Client] = None
+        self._client_lock = threading.Lock()
+        
+        # aiohttp session for the async paths, created lazily because it must be
+        # bound to the running event loop; reused so connections stay warm
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_loop: Optional[asyncio.AbstractEventLoop] = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    def close(self):
+        """Close pooled connections of the sync client; the next scrape opens a new one."""
+        with self._client_lock:
+            if self._client is not None:
+                self._client.close()
+            self._client = None
+    
+    async def aclose(self):
+        """Close the async session and the sync client (e.g. on shutdown); both reopen on next use."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self.close()
+    
+    def _get_client(self) -> httpx.Client:
+        # scrape_many calls this from worker threads, so creation is locked
+        with self._client_lock:
+            if self._client is None:
+                self._client = httpx.Client(
+                    headers=self.headers,
+                    timeout=self.timeout,
+                    follow_redirects=True,
+                    transport=httpx.HTTPTransport(
+                        http2=h2 is not None,
+                        retries=2,
+                        limits=httpx.Limits(max_connections=20, max_keepalive_connections=20)
+                    )
+                )
+            return self._client
+    
+    def _get_session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            # Keep-alive pool: 32 connections overall, 20 per host like the sync client
+            connector = aiohttp.TCPConnector(
+                limit=32,
+                limit_per_host=20,
+                resolver=_dns_resolver,
+                ttl_dns_cache=DNS_CACHE_TTL
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers=self.headers,
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+            self._session_loop = loop
+        return self._session
     
-    def validate_url(self, url: str) -> bool:
+    def validate_url(self, url: str) -> ParseResult:
         """
         Validate URL format and security.
         
@@ -35,7 +225,7 @@ class WebScraper:
             url: URL to validate
             
         Returns:
-            True if valid
+            The parsed URL, so callers need not parse it again
             
         Raises:
             ValueError: If URL is invalid or blocked
@@ -46,17 +236,10 @@ class WebScraper:
         parsed = urlparse(url)
         
         # Prevent SSRF attacks - block internal networks
-        blocked_hosts = [
-            'localhost', '127.0.0.1', '0.0.0.0',
-            '10.', '172.16.', '192.168.',
-            'metadata.google.internal'
-        ]
+        if parsed.netloc.startswith(BLOCKED_PREFIXES):
+            raise ValueError("Access to internal networks is not allowed")
         
-        for blocked in blocked_hosts:
-            if parsed.netloc.startswith(blocked):
-                raise ValueError("Access to internal networks is not allowed")
-        
-        return True
+        return parsed
     
     def scrape_url(self, url: str) -> Dict:
         """
@@ -76,45 +259,236 @@ class WebScraper:
         Raises:
             ScraperError: If scraping fails
         """
+        cached = self._get_cached(url)
+        if cached is not None:
+            return cached
+        
+        result = self._fetch_and_parse(url)
+        self._set_cached(url, result)
+        return result
+    
+    async def ascrape_url(self, url: str) -> Dict:
+        """
+        Async version of scrape_url; does not block the event loop on network I/O.
+        
+        Raises:
+            ScraperError: If scraping fails
+        """
+        return (await self.scrape_urls([url]))[0]
+    
+    async def scrape_urls(self, urls: List[str], return_exceptions: bool = False) -> List:
+        """
+        Scrape several URLs concurrently over the shared, pooled aiohttp session.
+        
+        Args:
+            urls: URLs of the articles to scrape
+            return_exceptions: Return a ScraperError in place of each failed
+                article instead of raising the first failure
+            
+        Returns:
+            Scraped content dictionaries (see scrape_url), in the order of ``urls``
+            
+        Raises:
+            ScraperError: If any URL fails and return_exceptions is False
+        """
+        results = list(await asyncio.gather(*(self._aget_cached(url) for url in urls)))
+        misses = [i for i, result in enumerate(results) if result is None]
+        if not misses:
+            return results
+        
+        semaphore = asyncio.Semaphore(SCRAPE_CONCURRENCY)
+        session = self._get_session()
+        fetched = await asyncio.gather(
+            *(self._afetch_and_parse(session, semaphore, urls[i]) for i in misses),
+            return_exceptions=return_exceptions
+        )
+        
+        for i, result in zip(misses, fetched):
+            results[i] = result
+            if not isinstance(result, BaseException):
+                await self._aset_cached(urls[i], result)
+        return results
+    
+    def scrape_many(self, urls: List[str], max_workers: int = SCRAPE_CONCURRENCY) -> List[Dict]:
+        """
+        Scrape several URLs concurrently from synchronous code, using threads
+        that share the pooled HTTP client.
+        
+        Args:
+            urls: URLs of the articles to scrape
+            max_workers: Number of scraping threads
+            
+        Returns:
+            Scraped content dictionaries (see scrape_url), in the order of ``urls``
+            
+        Raises:
+            ScraperError: If any URL fails
+        """
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(self.scrape_url, urls))
+    
+    def _get_cached(self, url: str) -> Optional[Dict]:
+        key = sanitize_url(url)
+        result = self._get_local(key)
+        if result is None:
+            result = _scrape_cache.get(make_cache_key(key))
+            if result is None:
+                return None
+            self._set_local(key, result)
+        # Callers annotate the result (e.g. llm_content), so never hand out the cached dict
+        return copy.deepcopy(result)
+    
+    async def _aget_cached(self, url: str) -> Optional[Dict]:
+        # Same as _get_cached, with the Redis/disk lookup off the event loop
+        key = sanitize_url(url)
+        result = self._get_local(key)
+        if result is None:
+            result = await _scrape_cache.aget(make_cache_key(key))
+            if result is None:
+                return None
+            self._set_local(key, result)
+        return copy.deepcopy(result)
+    
+    def _set_cached(self, url: str, result: Dict):
+        key = sanitize_url(url)
+        self._set_local(key, copy.deepcopy(result))
+        _scrape_cache.set(make_cache_key(key), result)
+    
+    async def _aset_cached(self, url: str, result: Dict):
+        key = sanitize_url(url)
+        self._set_local(key, copy.deepcopy(result))
+        await _scrape_cache.aset(make_cache_key(key), result)
+    
+    def _get_local(self, key: str) -> Optional[Dict]:
+        with self._cache_lock:
+            return self._cache.get(key)
+    
+    def _set_local(self, key: str, result: Dict):
+        with self._cache_lock:
+            self._cache[key] = result
+    
+    def _fetch_and_parse(self, url: str) -> Dict:
         try:
             # Validate URL
-            self.validate_url(url)
+            is_wikipedia = _is_wikipedia_host(self.validate_url(url).hostname)
             
-            # Fetch the page
-            response = requests.get(url, headers=self.headers, timeout=self.timeout)
+            # Fetch the page, revalidating a previously parsed copy if we have one
+            validated = self._get_validators(url)
+            response = self._get_client().get(url, headers=validated[0] if validated else None)
+            if response.status_code == 304 and validated:
+                return copy.deepcopy(validated[1])
             response.raise_for_status()
             
-            print(f"DEBUG: Fetched page, status: {response.status_code}, content length: {len(response.content)}")
+            logger.debug(
+                "Fetched %s: status %d, %d bytes (Content-Encoding %s)",
+                url, response.status_code, len(response.content), response.headers.get('Content-Encoding')
+            )
             
-            # Debug: Save a snippet of the HTML to see what we got
-            html_preview = response.text[:2000]
-            print(f"DEBUG: HTML preview (first 500 chars): {html_preview[:500]}")
+            result = self._parse(response.content, url, is_wikipedia, response.charset_encoding)
+            self._remember_validators(url, response.headers, result)
+            return result
+                
+        except httpx.TimeoutException:
+            raise ScraperError("Request timed out. The page may be too large or slow to respond.")
+        except httpx.HTTPStatusError as e:
+            raise self._http_error(e.response.status_code, e)
+        except httpx.HTTPError as e:
+            raise ScraperError(f"Failed to fetch the page: {str(e)}")
+        except Exception as e:
+            raise ScraperError(f"Unexpected error during scraping: {str(e)}")
+    
+    async def _afetch_and_parse(
+        self,
+        session: aiohttp.ClientSession,
+        semaphore: asyncio.Semaphore,
+        url: str
+    ) -> Dict:
+        try:
+            is_wikipedia = _is_wikipedia_host(self.validate_url(url).hostname)
             
-            # Parse HTML
-            soup = BeautifulSoup(response.content, 'html.parser')
+            validated = self._get_validators(url)
+            async with semaphore:
+                response, content = await self._aget(session, url, validated[0] if validated else None)
+            if response.status == 304 and validated:
+                return copy.deepcopy(validated[1])
+            encoding = response.charset
             
-            # Check if it's Wikipedia
-            is_wikipedia = 'wikipedia.org' in url.lower()
+            logger.debug(
+                "Fetched %s: status %d, %d bytes (Content-Encoding %s)",
+                url, response.status, len(content), response.headers.get('Content-Encoding')
+            )
             
-            if is_wikipedia:
-                return self._scrape_wikipedia(soup, url)
-            else:
-                return self._scrape_generic(soup, url)
-                
-        except requests.exceptions.Timeout:
+            # Parsing is CPU-bound; run it in a thread so other fetches keep progressing
+            result = await asyncio.to_thread(self._parse, content, url, is_wikipedia, encoding)
+            self._remember_validators(url, response.headers, result)
+            return result
+            
+        except asyncio.TimeoutError:
             raise ScraperError("Request timed out. The page may be too large or slow to respond.")
-        except requests.exceptions.HTTPError as e:
-            if e.response.status_code == 404:
-                raise ScraperError("Page not found (404). Please check the URL.")
-            elif e.response.status_code == 403:
-                raise ScraperError("Access forbidden (403). The website may be blocking automated requests.")
-            else:
-                raise ScraperError(f"HTTP error {e.response.status_code}: {str(e)}")
-        except requests.exceptions.RequestException as e:
+        except aiohttp.ClientResponseError as e:
+            raise self._http_error(e.status, e)
+        except aiohttp.ClientError as e:
             raise ScraperError(f"Failed to fetch the page: {str(e)}")
         except Exception as e:
             raise ScraperError(f"Unexpected error during scraping: {str(e)}")
     
+    async def _aget(
+        self,
+        session: aiohttp.ClientSession,
+        url: str,
+        headers: Optional[Dict[str, str]]
+    ) -> Tuple[aiohttp.ClientResponse, bytes]:
+        # GET is idempotent, so a refused connection or a pooled keep-alive
+        # connection the server already closed is safe to retry
+        for attempt in range(FETCH_RETRIES + 1):
+            try:
+                async with session.get(url, headers=headers) as response:
+                    response.raise_for_status()
+                    return response, await response.read()
+            except (aiohttp.ClientConnectorError, aiohttp.ServerDisconnectedError):
+                if attempt == FETCH_RETRIES:
+                    raise
+                await asyncio.sleep(FETCH_RETRY_BACKOFF * 2 ** attempt)
+    
+    def _remember_validators(self, url: str, response_headers: Mapping[str, str], result: Dict):
+        headers = {}
+        if response_headers.get('ETag'):
+            headers['If-None-Match'] = response_headers['ETag']
+        if response_headers.get('Last-Modified'):
+            headers['If-Modified-Since'] = response_headers['Last-Modified']
+        if headers:
+            with self._cache_lock:
+                self._validators[sanitize_url(url)] = (headers, copy.deepcopy(result))
+    
+    def _get_validators(self, url: str) -> Optional[Tuple[Dict[str, str], Dict]]:
+        with self._cache_lock:
+            return self._validators.get(sanitize_url(url))
+    
+    def _http_error(self, status_code: int, error: Exception) -> ScraperError:
+        if status_code == 404:
+            return ScraperError("Page not found (404). Please check the URL.")
+        elif status_code == 403:
+            return ScraperError("Access forbidden (403). The website may be blocking automated requests.")
+        else:
+            return ScraperError(f"HTTP error {status_code}: {str(error)}")
+    
+    def _parse(self, content: bytes, url: str, is_wikipedia: bool, encoding: Optional[str] = None) -> Dict:
+        # The Content-Type charset, when sent, spares the parser from sniffing
+        # and trial-decoding the body. Canonicalize it: lxml rejects some
+        # aliases (e.g. "latin-1") and would silently fall back to guessing.
+        try:
+            encoding = codecs.lookup(encoding).name if encoding else None
+        except LookupError:
+            encoding = None
+        
+        # Parse the raw bytes with the libxml2-backed parser (several times faster than html.parser)
+        soup = BeautifulSoup(content, 'lxml', from_encoding=encoding)
+        
+        if is_wikipedia:
+            return self._scrape_wikipedia(soup, url)
+        else:
+            return self._scrape_generic(soup, url)
+    
     def _scrape_wikipedia(self, soup: BeautifulSoup, url: str) -> Dict:
         """
         Scrape Wikipedia articles with special handling.
@@ -134,7 +508,7 @@ class WebScraper:
         content_div = None
         candidate_divs = soup.find_all('div', {'class': 'mw-parser-output'})
         for candidate in candidate_divs:
-            paragraph_count = len(candidate.find_all('p'))
+            paragraph_count = len(candidate.find_all('p', limit=3))
             if paragraph_count >= 3:
                 content_div = candidate
                 break
@@ -149,50 +523,27 @@ class WebScraper:
                 content_div = legacy.find('div', {'class': 'mw-parser-output'}) or legacy
         
         if not content_div:
-            raise ScraperError("Could not find main content area in Wikipedia article")        # First, let's check paragraph count BEFORE any removal
-        paras_before_removal = content_div.find_all('p')
-        print(f"DEBUG: Paragraphs before removal: {len(paras_before_removal)}")
-        
-        # Remove unwanted elements FIRST before extracting text
-        for tag_name in ['script', 'style', 'nav', 'footer', 'aside']:
-            for elem in content_div.find_all(tag_name):
-                elem.decompose()
-        
-        # Remove reference links and edit sections
-        for span in content_div.find_all('span', {'class': ['mw-editsection', 'reference']}):
-            span.decompose()
-        
-        # Remove infoboxes and navboxes, but keep other tables
-        tables_to_remove = []
-        for table in content_div.find_all('table'):
-            table_classes = table.get('class', [])
-            if any(cls in ['infobox', 'navbox', 'vertical-navbox', 'sidebar'] for cls in table_classes):
-                tables_to_remove.append(table)
-
-        # Remove the tables
-        for table in tables_to_remove:
-            table.decompose()
+            raise ScraperError("Could not find main content area in Wikipedia article")
         
-        # Remove superscript references
-        for sup in content_div.find_all('sup', {'class': 'reference'}):
-            sup.decompose()
+        # Remove unwanted elements FIRST before extracting text: page chrome,
+        # reference links, edit sections, and infoboxes/navboxes (other tables stay)
+        for elem in content_div.select(_WIKIPEDIA_NOISE_SELECTOR):
+            elem.decompose()
         
         # Extract all paragraphs
-        paragraphs = content_div.find_all('p')
+        paragraphs = content_div.select('p')
         full_text_parts = []
         
-        print(f"DEBUG: Found {len(paragraphs)} paragraphs in total")  # Debug
-        
         for p in paragraphs:
             text = self._clean_text(p.get_text())
             if text and len(text) > 10:  # Filter very short paragraphs (reduced threshold)
                 full_text_parts.append(text)
         
-        print(f"DEBUG: {len(full_text_parts)} paragraphs passed filter")  # Debug
+        logger.debug("%d of %d paragraphs passed filter", len(full_text_parts), len(paragraphs))
         
         # Extract sections with headings
         sections = []
-        headings = content_div.find_all(['h2', 'h3'])
+        headings = content_div.select('h2, h3')
         
         # Add introduction
         if full_text_parts:
@@ -213,18 +564,17 @@ class WebScraper:
             
             # Get content paragraphs after this heading
             section_paras = []
-            current = heading.find_next_sibling()
             
-            while current and current.name not in ['h2', 'h3']:
-                if current.name == 'p':
-                    text = self._clean_text(current.get_text())
+            # One pass over the siblings up to the next heading
+            for sibling in takewhile(_is_not_heading, heading.next_siblings):
+                if sibling.name == 'p':
+                    text = self._clean_text(sibling.get_text())
                     if text and len(text) > 10:  # Reduced threshold
                         section_paras.append(text)
-                current = current.find_next_sibling()
-                
-                # Limit section length
-                if len(section_paras) >= 3:
-                    break
+                        
+                        # Limit section length
+                        if len(section_paras) >= 3:
+                            break
             
             if section_paras:
                 sections.append({
@@ -236,7 +586,7 @@ class WebScraper:
         full_text = ' '.join(full_text_parts)
         word_count = len(full_text.split())
         
-        print(f"DEBUG: Total word count: {word_count}, Min required: {settings.MIN_CONTENT_WORDS}")  # Debug
+        logger.debug("Total word count: %d, min required: %d", word_count, settings.MIN_CONTENT_WORDS)
         
         # Add debug info if scraping fails
         if word_count < settings.MIN_CONTENT_WORDS:
@@ -298,7 +648,7 @@ class WebScraper:
         # Try to find main content area
         content_area = (soup.find('article') or 
                        soup.find('main') or 
-                       soup.find('div', {'class': re.compile(r'content|article|post', re.I)}) or
+                       soup.find('div', {'class': _CONTENT_CLASS_RE}) or
                        soup.find('body'))
         
         if not content_area:
@@ -313,28 +663,27 @@ class WebScraper:
         paragraphs = content_area.find_all(['p', 'h1', 'h2', 'h3', 'h4'])
         
         sections = []
-        current_section = {'heading': 'Main Content', 'content': ''}
+        section_heading = 'Main Content'
+        section_parts = []
         text_parts = []
         
         for elem in paragraphs:
             if elem.name in ['h1', 'h2', 'h3', 'h4']:
                 # Save previous section
-                if current_section['content']:
-                    sections.append(current_section.copy())
+                if section_parts:
+                    sections.append({'heading': section_heading, 'content': ' '.join(section_parts)})
                 # Start new section
-                current_section = {
-                    'heading': self._clean_text(elem.text),
-                    'content': ''
-                }
+                section_heading = self._clean_text(elem.text)
+                section_parts = []
             elif elem.name == 'p':
                 text = self._clean_text(elem.text)
                 if text:
-                    current_section['content'] += ' ' + text
+                    section_parts.append(text)
                     text_parts.append(text)
         
         # Add last section
-        if current_section['content']:
-            sections.append(current_section)
+        if section_parts:
+            sections.append({'heading': section_heading, 'content': ' '.join(section_parts)})
         
         full_text = ' '.join(text_parts)
         word_count = len(full_text.split())
@@ -364,16 +713,7 @@ class WebScraper:
         Returns:
             Cleaned text
         """
-        # Remove citation brackets
-        text = re.sub(r'\[\d+\]', '', text)
-        text = re.sub(r'\[edit\]', '', text)
-        text = re.sub(r'\[citation needed\]', '', text)
-        
-        # Remove extra whitespace
-        text = re.sub(r'\s+', ' ', text)
-        
-        # Strip and return
-        return text.strip()
+        return _clean_text(text)
 
 
 # Create singleton instance
@@ -0,0 +1,200 @@
+"""
+Tiered cache for expensive, deterministic results.
+Values are kept in an in-process LRU and, when REDIS_URL is configured,
+in Redis so that other workers can reuse them; a cache can also persist
+entries as gzip files on disk so they survive restarts, pruned by age and count.
+"""
+
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import time
+from typing import Any, Optional
+
+from cachetools import LRUCache
+
+from ..config import settings
+
+try:
+    import redis
+except ImportError:  # Redis is optional; the in-process tier still works
+    redis = None
+
+
+# Seconds between sweeps of a cache's disk directory for expired or excess files
+DISK_PRUNE_INTERVAL = 600
+
+_redis_client = None
+
+
+def _get_redis():
+    """Return the shared Redis client, or None if Redis is not configured."""
+    global _redis_client
+    if _redis_client is None and redis is not None and settings.REDIS_URL:
+        _redis_client = redis.Redis.from_url(
+            settings.REDIS_URL,
+            socket_timeout=0.5,
+            socket_connect_timeout=0.5
+        )
+    return _redis_client
+
+
+def make_cache_key(*parts: Any) -> str:
+    """
+    Build a stable cache key from arbitrary JSON-serializable parts.
+
+    Args:
+        parts: Values identifying the cached result
+
+    Returns:
+        SHA-256 hex digest
+    """
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """LRU cache with optional Redis and disk tiers. Values must be JSON-serializable."""
+
+    def __init__(
+        self,
+        namespace: str,
+        maxsize: int = 1024,
+        ttl: int = 7 * 24 * 3600,
+        disk_dir: Optional[str] = None,
+        max_disk_entries: int = 10_000
+    ):
+        """
+        Args:
+            namespace: Prefix for Redis keys and cache file names
+            maxsize: Number of entries kept in process (0 disables the in-process tier)
+            ttl: Expiry in seconds for the Redis and disk tiers
+            disk_dir: Directory for gzip cache files, or None to skip the disk tier
+            max_disk_entries: Files kept on disk; the oldest are pruned beyond this
+        """
+        self.namespace = namespace
+        self.ttl = ttl
+        self.disk_dir = disk_dir
+        self.max_disk_entries = max_disk_entries
+        self._last_prune = 0.0
+        # Entries are stored serialized so every hit returns a fresh copy
+        self._local: Optional[LRUCache] = LRUCache(maxsize=maxsize) if maxsize else None
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for ``key``, or None on a miss."""
+        raw = self._local.get(key) if self._local is not None else None
+        if raw is None:
+            raw = self._get_shared(key)
+            if raw is None:
+                return None
+            if self._local is not None:
+                self._local[key] = raw
+        return json.loads(raw)
+
+    def set(self, key: str, value: Any) -> None:
+        """Store ``value`` under ``key`` in every configured tier."""
+        raw = json.dumps(value, ensure_ascii=False)
+        if self._local is not None:
+            self._local[key] = raw
+        self._set_shared(key, raw)
+
+    async def aget(self, key: str) -> Optional[Any]:
+        """Async variant of get; Redis and disk lookups run in a worker thread."""
+        raw = self._local.get(key) if self._local is not None else None
+        if raw is None:
+            if not self._has_shared_tiers():
+                return None
+            raw = await asyncio.to_thread(self._get_shared, key)
+            if raw is None:
+                return None
+            if self._local is not None:
+                self._local[key] = raw
+        return json.loads(raw)
+
+    async def aset(self, key: str, value: Any) -> None:
+        """Async variant of set; Redis and disk writes run in a worker thread."""
+        raw = json.dumps(value, ensure_ascii=False)
+        if self._local is not None:
+            self._local[key] = raw
+        if self._has_shared_tiers():
+            await asyncio.to_thread(self._set_shared, key, raw)
+
+    def _has_shared_tiers(self) -> bool:
+        return bool(self.disk_dir) or _get_redis() is not None
+
+    def _get_shared(self, key: str) -> Optional[bytes]:
+        raw = self._get_redis(key)
+        if raw is None:
+            raw = self._get_disk(key)
+        return raw
+
+    def _set_shared(self, key: str, raw: str) -> None:
+        client = _get_redis()
+        if client is not None:
+            try:
+                client.set(f"{self.namespace}:{key}", raw, ex=self.ttl)
+            except redis.RedisError:
+                pass  # The shared tier is best-effort
+        if self.disk_dir:
+            self._set_disk(key, raw)
+
+    def _get_redis(self, key: str) -> Optional[bytes]:
+        client = _get_redis()
+        if client is None:
+            return None
+        try:
+            return client.get(f"{self.namespace}:{key}")
+        except redis.RedisError:
+            return None
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"{self.namespace}-{key}.json.gz")
+
+    def _get_disk(self, key: str) -> Optional[bytes]:
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl:
+                os.remove(path)
+                return None
+            with gzip.open(path, 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _set_disk(self, key: str, raw: str) -> None:
+        try:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            # Write to a temp file and rename so readers never see a partial file
+            fd, tmp_path = tempfile.mkstemp(dir=self.disk_dir, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(gzip.compress(raw.encode('utf-8'), compresslevel=1))
+            os.replace(tmp_path, self._disk_path(key))
+        except OSError:
+            pass  # The disk tier is best-effort
+        if time.time() - self._last_prune >= DISK_PRUNE_INTERVAL:
+            self._prune_disk()
+
+    def _prune_disk(self) -> None:
+        """Delete expired cache files, then the oldest ones beyond max_disk_entries."""
+        self._last_prune = now = time.time()
+        prefix = f"{self.namespace}-"
+        try:
+            entries = [
+                (entry.stat().st_mtime, entry.path)
+                for entry in os.scandir(self.disk_dir)
+                if entry.name.startswith(prefix) and entry.name.endswith('.json.gz')
+            ]
+        except OSError:
+            return
+        entries.sort(reverse=True)
+        for index, (mtime, path) in enumerate(entries):
+            if index >= self.max_disk_entries or now - mtime > self.ttl:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass  # Already removed by another worker
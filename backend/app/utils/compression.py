@@ -0,0 +1,81 @@
+"""
+Prompt compression with LLMLingua-2.
+Drops low-information tokens from article text before it is sent to the LLM
+when llmlingua is installed and PROMPT_COMPRESSION_RATE is below 1.
+"""
+
+import hashlib
+from typing import Optional
+
+from cachetools import LRUCache
+
+from ..config import settings
+
+try:
+    from llmlingua import PromptCompressor
+except ImportError:  # llmlingua is optional; content is sent uncompressed
+    PromptCompressor = None
+
+
+_COMPRESSOR_MODEL = "microsoft/llmlingua-2-bert-base-multilingual-cased-meetingbank"
+
+# Tokens the compressor must keep so sentence structure survives
+_FORCE_TOKENS = ["\n", "?", ".", ","]
+
+_compressor = None
+_compressor_unavailable = PromptCompressor is None or settings.PROMPT_COMPRESSION_RATE >= 1
+
+# Compressed text keyed by SHA-256 of the input; the same article is
+# compressed once for all prompts that use it
+_compressed: LRUCache = LRUCache(maxsize=256)
+
+
+def _get_compressor():
+    """Load the compression model once, or return None if it cannot be used."""
+    global _compressor, _compressor_unavailable
+    if _compressor is None and not _compressor_unavailable:
+        try:
+            _compressor = PromptCompressor(
+                model_name=_COMPRESSOR_MODEL,
+                device_map="cpu",
+                use_llmlingua2=True
+            )
+        except Exception:  # model download or load failure
+            _compressor_unavailable = True
+    return _compressor
+
+
+def compression_enabled() -> bool:
+    """Return True if compress_text will actually compress."""
+    return not _compressor_unavailable
+
+
+def compress_text(text: str, rate: Optional[float] = None) -> str:
+    """
+    Compress text to roughly ``rate`` of its original token count.
+
+    Args:
+        text: Article text to compress
+        rate: Fraction of tokens to keep (defaults to PROMPT_COMPRESSION_RATE)
+
+    Returns:
+        Compressed text, or the input unchanged if compression is unavailable
+    """
+    compressor = _get_compressor()
+    if compressor is None or not text:
+        return text
+
+    rate = settings.PROMPT_COMPRESSION_RATE if rate is None else rate
+    key = hashlib.sha256(f"{rate}:{text}".encode('utf-8')).hexdigest()
+    compressed = _compressed.get(key)
+    if compressed is None:
+        try:
+            compressed = compressor.compress_prompt(
+                text,
+                rate=rate,
+                force_tokens=_FORCE_TOKENS
+            )["compressed_prompt"]
+        except Exception:
+            return text
+        _compressed[key] = compressed
+    return compressed
@@ -6,6 +6,12 @@ import re
 from typing import List
 
 
+# Question format rules shared by every validate_question_format call
+_REQUIRED_QUESTION_FIELDS = ('question', 'options', 'answer', 'difficulty', 'explanation')
+_VALID_ANSWERS = frozenset('ABCD')
+_VALID_DIFFICULTIES = frozenset(('easy', 'medium', 'hard'))
+
+
 def truncate_text(text: str, max_tokens: int = 4000) -> str:
     """
     Truncate text to approximate token limit.
@@ -22,14 +28,41 @@ def truncate_text(text: str, max_tokens: int = 4000) -> str:
     if len(text) <= max_chars:
         return text
     
-    # Truncate and try to end at a sentence
-    truncated = text[:max_chars]
-    last_period = truncated.rfind('.')
+    # Try to end at a sentence: search the last 20% in place so only the
+    # final cut is copied
+    last_period = text.rfind('.', int(max_chars * 0.8) + 1, max_chars)
+    
+    if last_period != -1:
+        return text[:last_period + 1]
     
-    if last_period > max_chars * 0.8:  # If we can find a period in the last 20%
-        return truncated[:last_period + 1]
+    return text[:max_chars] + "..."
+
+
+def dedupe_names(names: List[str], limit: int = 10) -> List[str]:
+    """
+    Remove blank and case-insensitive duplicate names, keeping first occurrences.
     
-    return truncated + "..."
+    Args:
+        names: Entity names in extraction order
+        limit: Maximum names to keep
+        
+    Returns:
+        Stripped, deduplicated names
+    """
+    seen = set()
+    unique = []
+    for name in names:
+        if not isinstance(name, str):
+            continue
+        name = name.strip()
+        key = name.casefold()
+        if not name or key in seen:
+            continue
+        seen.add(key)
+        unique.append(name)
+        if len(unique) >= limit:
+            break
+    return unique
 
 
 def extract_sections_list(sections: List[dict]) -> List[str]:
@@ -58,9 +91,7 @@ def validate_question_format(question_data: dict) -> bool:
     Raises:
         ValueError: If format is invalid
     """
-    required_fields = ['question', 'options', 'answer', 'difficulty', 'explanation']
-    
-    for field in required_fields:
+    for field in _REQUIRED_QUESTION_FIELDS:
         if field not in question_data:
             raise ValueError(f"Missing required field: {field}")
     
@@ -68,12 +99,14 @@ def validate_question_format(question_data: dict) -> bool:
     if not isinstance(question_data['options'], list) or len(question_data['options']) != 4:
         raise ValueError("Options must be a list of exactly 4 items")
     
-    # Validate answer
-    if question_data['answer'] not in ['A', 'B', 'C', 'D']:
+    # Validate answer (the isinstance check keeps unhashable values from raising TypeError)
+    answer = question_data['answer']
+    if not isinstance(answer, str) or answer not in _VALID_ANSWERS:
         raise ValueError("Answer must be A, B, C, or D")
     
     # Validate difficulty
-    if question_data['difficulty'] not in ['easy', 'medium', 'hard']:
+    difficulty = question_data['difficulty']
+    if not isinstance(difficulty, str) or difficulty not in _VALID_DIFFICULTIES:
         raise ValueError("Difficulty must be easy, medium, or hard")
     
     return True
@@ -118,3 +151,22 @@ def sanitize_url(url: str) -> str:
         url = url.split('#')[0]
     
     return url.strip()
+
+
+def build_fts_query(search: str) -> str:
+    """
+    Convert free-text search input into a trigram FTS5 MATCH expression.
+    
+    The whole input is quoted as one phrase (so punctuation is taken
+    literally), which a trigram index matches as a case-insensitive
+    substring, the same as ``ILIKE '%search%'``.
+    
+    Args:
+        search: Raw search text from the user
+        
+    Returns:
+        FTS5 query string, empty if the input is too short for trigrams
+    """
+    if len(search) < 3:
+        return ''
+    return '"{}"'.format(search.replace('"', '""'))
@@ -0,0 +1,78 @@
+"""
+Local named-entity recognition with spaCy.
+Used instead of an LLM call for people/organization/location extraction
+when spaCy and the en_core_web_sm model are installed.
+"""
+
+from typing import Dict, List, Optional
+
+from .helpers import dedupe_names
+
+try:
+    import spacy
+except ImportError:  # spaCy is optional; callers fall back to the LLM
+    spacy = None
+
+
+# Longest text handed to spaCy per article
+MAX_NER_CHARS = 100_000
+
+# spaCy label -> key in the entities dictionary
+_LABEL_KEYS = {
+    'PERSON': 'people',
+    'ORG': 'organizations',
+    'GPE': 'locations',
+    'LOC': 'locations',
+}
+
+_nlp = None
+_nlp_unavailable = spacy is None
+
+
+def _get_nlp():
+    """Load the spaCy pipeline once, or return None if it is not installed."""
+    global _nlp, _nlp_unavailable
+    if _nlp is None and not _nlp_unavailable:
+        try:
+            _nlp = spacy.load(
+                "en_core_web_sm",
+                disable=["parser", "lemmatizer", "attribute_ruler", "tagger"]
+            )
+        except OSError:  # model package not downloaded
+            _nlp_unavailable = True
+    return _nlp
+
+
+def ner_available() -> bool:
+    """
+    Whether local NER can be used, without loading the model.
+
+    Stays True until a load attempt finds the model missing, after which
+    extract_named_entities returns None and callers use the LLM instead.
+    """
+    return not _nlp_unavailable
+
+
+def extract_named_entities(content: str, limit: int = 10) -> Optional[Dict[str, List[str]]]:
+    """
+    Extract people, organizations and locations from text.
+
+    Args:
+        content: Article text
+        limit: Maximum entities kept per category
+
+    Returns:
+        Dictionary with people, organizations, and locations (first occurrence
+        order, case-insensitive duplicates removed), or None if spaCy is unavailable
+    """
+    nlp = _get_nlp()
+    if nlp is None:
+        return None
+
+    found: Dict[str, List[str]] = {'people': [], 'organizations': [], 'locations': []}
+    for ent in nlp(content[:MAX_NER_CHARS]).ents:
+        key = _LABEL_KEYS.get(ent.label_)
+        if key:
+            found[key].append(ent.text)
+
+    return {key: dedupe_names(names, limit) for key, names in found.items()}
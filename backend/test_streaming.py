@@ -0,0 +1,150 @@
+"""Test streamed quiz responses: incremental delivery and client disconnects."""
+import asyncio
+import os
+import tempfile
+
+# Point the app at a throwaway database before it is imported
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "test_streaming.db")
+
+import orjson
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, select
+
+from app.database import SessionLocal, engine, init_db
+from app.main import StreamingAwareGZipMiddleware, app
+from app.models.quiz import Quiz
+from app.services.llm_service import llm_service
+from app.services.quiz_generator import quiz_service
+from app.services.scraper import scraper
+
+
+async def read_first_chunk(media_type: str):
+    """Stream a response through the middleware and return what arrives before it ends."""
+    release = asyncio.Event()
+
+    async def body():
+        yield b'{"type": "scraped"}\n' * 64
+        await release.wait()
+        yield b'{"type": "complete"}\n'
+
+    async def app(scope, receive, send):
+        await StreamingResponse(body(), media_type=media_type)(scope, receive, send)
+
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    async def receive():
+        await release.wait()
+        return {"type": "http.disconnect"}
+
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "path": "/",
+        "headers": [(b"accept-encoding", b"gzip")],
+    }
+    middleware = StreamingAwareGZipMiddleware(app, minimum_size=1024, compresslevel=5)
+    task = asyncio.create_task(middleware(scope, receive, send))
+
+    # The generator is now blocked on release; collect what the client has seen so far
+    await asyncio.sleep(0.1)
+    headers = dict(messages[0]["headers"]) if messages else {}
+    early_body = b"".join(m.get("body", b"") for m in messages if m["type"] == "http.response.body")
+
+    release.set()
+    await task
+    return headers, early_body
+
+
+def test_ndjson_stream_is_not_buffered():
+    headers, early_body = asyncio.run(read_first_chunk("application/x-ndjson"))
+    assert b"content-encoding" not in headers
+    assert early_body.startswith(b'{"type": "scraped"}\n')
+
+
+def test_sse_stream_is_not_buffered():
+    headers, early_body = asyncio.run(read_first_chunk("text/event-stream"))
+    assert b"content-encoding" not in headers
+    assert early_body.startswith(b'{"type": "scraped"}\n')
+
+
+def test_json_is_still_compressed():
+    headers, _ = asyncio.run(read_first_chunk("application/json"))
+    assert headers.get(b"content-encoding") == b"gzip"
+
+
+async def disconnect_mid_stream():
+    """Drop the client after the first streamed question and return the rows left behind."""
+    await init_db()
+    first_question = asyncio.Event()
+
+    async def ascrape_url(url):
+        return {"title": "Example", "full_text": "Example text. " * 50, "sections": [], "word_count": 100}
+
+    async def astream_quiz(title, content, num_questions):
+        yield {"question": "What?", "options": ["a", "b", "c", "d"], "answer": "a"}
+        await asyncio.Event().wait()
+
+    async def analyze_content(scraped_data):
+        return {"summary": "", "key_entities": {}, "related_topics": []}
+
+    scraper.ascrape_url = ascrape_url
+    llm_service.astream_quiz = astream_quiz
+    quiz_service._analyze_content = analyze_content
+
+    requested = False
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            body = orjson.dumps({"url": "https://en.wikipedia.org/wiki/Example"})
+            return {"type": "http.request", "body": body, "more_body": False}
+        await first_question.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if b'"question"' in message.get("body", b""):
+            first_question.set()
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": "/api/quiz/generate/stream",
+        "raw_path": b"/api/quiz/generate/stream",
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"host", b"testserver"), (b"content-type", b"application/json")],
+        "client": ("127.0.0.1", 50000),
+        "server": ("testserver", 80),
+    }
+    await asyncio.wait_for(app(scope, receive, send), timeout=10)
+
+    async with SessionLocal() as db:
+        rows = await db.scalar(select(func.count()).select_from(Quiz))
+    checked_out = engine.pool.checkedout()
+    await engine.dispose()
+    return rows, checked_out
+
+
+def test_disconnect_releases_placeholder():
+    rows, checked_out = asyncio.run(disconnect_mid_stream())
+    # The claimed placeholder row is deleted and the stream's session returned to the pool
+    assert rows == 0
+    assert checked_out == 0
+
+
+if __name__ == "__main__":
+    for test in (
+        test_ndjson_stream_is_not_buffered,
+        test_sse_stream_is_not_buffered,
+        test_json_is_still_compressed,
+        test_disconnect_releases_placeholder,
+    ):
+        test()
+        print(f'{test.__name__}: ok')